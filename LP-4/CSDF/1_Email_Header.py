@@ -1,6 +1,16 @@
 import email
 from email.parser import Parser
 import re
+import sys
+
+from ip_enrich import IpEnricher, DATASET
+
+# --- Bulk mode: python 1_Email_Header.py ARCHIVE [OUT.jsonl|OUT.csv] [IP_DATASET.csv] ---
+# Runs the mbox/Maildir triage in mail_triage.py instead of the sample below.
+if __name__ == "__main__" and len(sys.argv) > 1:
+    from mail_triage import triage
+    triage(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else '-', ip_data=sys.argv[3] if len(sys.argv) > 3 else None)
+    sys.exit()
 
 # --- Sample email header ---
 sample_header = """\
@@ -34,8 +44,16 @@ for i, header in enumerate(received_headers, start=1):
 
 # --- Extract IP addresses from Received headers ---
 print("\n--- Extracted IP Addresses ---")
-ip_pattern = r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b'
+ip_pattern = re.compile(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')
+try:
+    enricher = IpEnricher.load(DATASET)
+except OSError as e:
+    # Without the dataset every address is reported as not in it.
+    print(f"IP dataset unavailable ({e})", file=sys.stderr)
+    enricher = IpEnricher()
 for header in received_headers:
-    ips = re.findall(ip_pattern, header)
+    ips = ip_pattern.findall(header)
     for ip in ips:
-        print(ip)
\ No newline at end of file
+        info = enricher.lookup(ip)
+        origin = f"{info['network']} AS{info['asn']} {info['country']} ({info['as_name']})" if info['network'] else "not in dataset"
+        print(f"{ip}\t{info['scope']}\t{origin}")
\ No newline at end of file
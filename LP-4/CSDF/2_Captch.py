@@ -4,6 +4,7 @@ import os
 import sys
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import webbrowser
+from functools import lru_cache
 
 # --- Config ---
 WIDTH = 220
@@ -16,6 +17,7 @@ FONT_SIZE = 40
 def random_text(length=LENGTH):
     return "".join(random.choice(CHARS) for _ in range(length))
 
+@lru_cache(maxsize=None)
 def load_font(size=FONT_SIZE):
     # Common font paths for Linux and Windows
     font_paths = [
@@ -1,20 +1,24 @@
-import os
-import shutil
+import sys
+
+from recovery_engine import RecoveryEngine
 
 # Simulate deleted files by putting them in this folder
 deleted_folder = "DeletedFilesSimulation"
 
 # Folder to store recovered files
 recovered_folder = "RecoveredFiles"
-os.makedirs(recovered_folder, exist_ok=True)
 
-# Scan deleted folder for "deleted" files (simulated with .deleted extension)
-for root, dirs, files in os.walk(deleted_folder):
-    for file in files:
-        if file.endswith(".deleted"):
-            old_path = os.path.join(root, file)
-            new_path = os.path.join(recovered_folder, file.replace(".deleted", ""))
-            shutil.copy2(old_path, new_path)
-            print(f"Recovered: {file} -> {new_path}")
+# Scan deleted folder for "deleted" files (simulated with .deleted extension).
+# Files are copied in parallel and hashed; RecoveredFiles/.recovery_manifest.jsonl
+# records what is done, so running this again only copies what is missing.
+def report(file, result):
+    if isinstance(result, OSError):
+        print(f"Failed: {file}: {result}", file=sys.stderr)
+    else:
+        print(f"Recovered: {file} -> {result['dest']} (sha256 {result['sha256'][:16]}...)")
+
+engine = RecoveryEngine(deleted_folder, recovered_folder)
+stats = engine.run(report if "-q" not in sys.argv else None)
 
-print("Recovery simulation complete.")
\ No newline at end of file
+print(f"Recovery simulation complete: {stats['recovered']} recovered, "
+      f"{stats['skipped']} already recovered, {stats['failed']} failed.")
@@ -0,0 +1,237 @@
+import os
+import string
+import struct
+import sys
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Fast CAPTCHA rendering with the same look as generate_captcha() in
+# 2_Captch.py. The font is loaded once, every character is pre-rendered
+# once per rotation bucket as an alpha mask, and all per-image work is done
+# on a NumPy canvas: every random parameter is drawn in one call,
+# background boxes are slice fills, glyphs are blends of cached masks, and
+# noise lines and dots are written with one fancy-indexed assignment each.
+# The SMOOTH filter and PNG encoding are done in NumPy/zlib as well.
+
+# --- Config ---
+WIDTH = 220
+HEIGHT = 80
+CHARS = string.ascii_uppercase + string.digits
+LENGTH = 6
+FONT_SIZE = 40
+MAX_ANGLE = 25
+ANGLE_STEP = 5
+
+FONT_PATHS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf", # Linux alternative
+    "C:\\Windows\\Fonts\\arial.ttf",                        # Windows
+]
+
+# --- Font and glyph cache ---
+@lru_cache(maxsize=None)
+def load_font(size=FONT_SIZE):
+    for path in FONT_PATHS:
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default()
+
+def render_glyph(ch, angle, font, font_size=FONT_SIZE):
+    # Same steps as 2_Captch.py; returns the rotated alpha channel.
+    ch_img = Image.new("RGBA", (font_size + 10, font_size + 10), (0, 0, 0, 0))
+    ImageDraw.Draw(ch_img).text((5, 0), ch, font=font, fill=(0, 0, 0))
+    ch_img = ch_img.rotate(angle, resample=Image.BICUBIC, expand=1)
+    return np.asarray(ch_img)[:, :, 3].astype(np.uint16)
+
+PAD = 2
+WHITE = 0xFFFFFFFF
+
+# --- Filtering and encoding ---
+def pack_colors(rgb):
+    # (..., 3) ints -> (...,) uint32 pixels, matching a uint8 view of R, G, B, A.
+    rgb = np.asarray(rgb, dtype='<u4')
+    return rgb[..., 0] | (rgb[..., 1] << 8) | (rgb[..., 2] << 16) | np.uint32(0xFF000000)
+
+def smooth(canvas):
+    # ImageFilter.SMOOTH (3x3 kernel 1 1 1 / 1 5 1 / 1 1 1, divided by 13,
+    # border pixels left as they are), bit-identical to PIL's result.
+    # The 3x3 box sum is done as row sums then column sums, plus 4x the
+    # centre.
+    a = canvas.astype(np.uint16)
+    rows = a[:, :-2] + a[:, 1:-1] + a[:, 2:]
+    total = rows[:-2] + rows[1:-1] + rows[2:]
+    total += 4 * a[1:-1, 1:-1]
+    total += 6
+    out = canvas.copy()
+    out[1:-1, 1:-1] = total // 13
+    return out
+
+def png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+def encode_png(canvas, level=1):
+    # Minimal RGB PNG: filter type 0 on every row and one zlib stream. For
+    # these noisy images this is smaller and several times faster than
+    # PIL's adaptive row filters.
+    h, w, _ = canvas.shape
+    raw = np.zeros((h, 3 * w + 1), dtype=np.uint8)
+    raw[:, 1:] = canvas.reshape(h, -1)
+    return (b"\x89PNG\r\n\x1a\n"
+            + png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+            + png_chunk(b"IDAT", zlib.compress(raw.tobytes(), level))
+            + png_chunk(b"IEND", b""))
+
+class CaptchaRenderer:
+
+    def __init__(self, width=WIDTH, height=HEIGHT, chars=CHARS, font_size=FONT_SIZE,
+                 max_angle=MAX_ANGLE, angle_step=ANGLE_STEP, seed=None):
+        self.width = width
+        self.height = height
+        self.chars = chars
+        self.font_size = font_size
+        self.angles = np.arange(-max_angle, max_angle + angle_step / 2, angle_step)
+        self.rng = np.random.default_rng(seed)
+        font = load_font(font_size)
+        # glyphs[ch][bucket]: 256 * (1 - alpha) as uint16, so blending a
+        # black glyph is one multiply and one shift.
+        self.glyphs = {ch: [((255 - render_glyph(ch, angle, font, font_size)) * 256 + 127) // 255 for angle in self.angles]
+                       for ch in chars}
+        # Sample positions along a noise line; enough for the longest one.
+        self.line_steps = np.linspace(0.0, 1.0, max(width, height) + 1)
+        # line_offsets[width, steep] -> (dx, dy) offsets of the 3 strands of
+        # a line; unused strands repeat the centre one.
+        self.line_offsets = np.zeros((4, 2, 2, 3), dtype=np.intp)
+        for line_width in range(1, 4):
+            strands = [k - (line_width - 1) // 2 if k < line_width else 0 for k in range(3)]
+            self.line_offsets[line_width, 0, 1] = strands
+            self.line_offsets[line_width, 1, 0] = strands
+        self.layouts = {}
+
+    def layout(self, n):
+        # Lower bounds and spans of every random parameter of an image with
+        # n characters, so one rng call draws them all:
+        #   8 boxes (x0, y0, dx, dy, r, g, b), n characters (y, bucket, step),
+        #   6 lines (x1, y1, x2, y2, width, r, g, b), 200 dots (x, y, r, g, b)
+        if n not in self.layouts:
+            w, h = self.width, self.height
+            box = [(0, w + 1), (0, h + 1), (30, 121), (10, 61)] + [(200, 256)] * 3
+            char = [(5, 21), (0, len(self.angles)), (self.font_size - 10, self.font_size + 1)]
+            line = [(0, w + 1), (0, h + 1), (0, w + 1), (0, h + 1), (1, 4)] + [(0, 121)] * 3
+            dot = [(0, w), (0, h)] + [(0, 201)] * 3
+            bounds = np.array(box * 8 + char * n + line * 6 + dot * 200)
+            self.layouts[n] = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+        return self.layouts[n]
+
+    def random_text(self, length=LENGTH):
+        return "".join(self.chars[i] for i in self.rng.integers(0, len(self.chars), size=length))
+
+    def render(self, text):
+        # Returns the unblurred (height, width, 3) uint8 canvas.
+        w, h = self.width, self.height
+        n = len(text)
+        lows, spans = self.layout(n)
+        params = lows + (self.rng.random(lows.size) * spans).astype(np.int64)
+        boxes = params[:56].reshape(8, 7)
+        chars = params[56:56 + 3 * n].reshape(n, 3)
+        lines = params[56 + 3 * n:104 + 3 * n].reshape(6, 8)
+        dots = params[104 + 3 * n:].reshape(200, 5)
+
+        # Pixels are packed RGBA words, so a fill is one store per pixel. The
+        # canvas has a PAD-pixel border so widened lines need no clipping.
+        canvas = np.full((h + 2 * PAD, w + 2 * PAD), WHITE, dtype='<u4')
+        inner = canvas[PAD:PAD + h, PAD:PAD + w]
+
+        # Background noise
+        box_colors = pack_colors(boxes[:, 4:]).tolist()
+        for (x0, y0, dx, dy), color in zip(boxes[:, :4].tolist(), box_colors):
+            inner[y0:y0 + dy + 1, x0:x0 + dx + 1] = color
+
+        # Draw characters: glyph masks are multiplied into one ink map,
+        # which is applied to the canvas once.
+        ink = np.full((h, w), 256, dtype=np.uint32)
+        char_x = 10
+        for ch, (y, bucket, step) in zip(text, chars.tolist()):
+            mask = self.glyphs[ch][bucket]
+            gh = min(mask.shape[0], h - y)
+            gw = min(mask.shape[1], w - char_x)
+            if gh > 0 and gw > 0:
+                region = ink[y:y + gh, char_x:char_x + gw]
+                region *= mask[:gh, :gw]
+                region >>= 8
+            char_x += step
+        # Applied to all channels of a packed pixel at once: R and B, then G
+        # and A, are two 8-bit lanes 16 bits apart, so one 32-bit multiply
+        # scales both without the lanes overlapping.
+        inner[...] = ((((inner & 0x00FF00FF) * ink) >> 8) & 0x00FF00FF) | ((((inner >> 8) & 0x00FF00FF) * ink) & 0xFF00FF00)
+
+        # Noise lines: every line sampled at the same number of points and
+        # widened across its minor axis with offsets from line_offsets.
+        x1, y1, x2, y2 = (lines[:, i:i + 1] + PAD for i in range(4))
+        xs = np.rint(x1 + self.line_steps * (x2 - x1)).astype(np.intp)
+        ys = np.rint(y1 + self.line_steps * (y2 - y1)).astype(np.intp)
+        steep = (np.abs(y2 - y1) > np.abs(x2 - x1))[:, 0].astype(np.intp)
+        offsets = self.line_offsets[lines[:, 4], steep]
+        dx, dy = offsets[:, 0], offsets[:, 1]
+        canvas[ys[:, None, :] + dy[:, :, None], xs[:, None, :] + dx[:, :, None]] = pack_colors(lines[:, 5:])[:, None, None]
+
+        # Noise dots
+        inner[dots[:, 1], dots[:, 0]] = pack_colors(dots[:, 2:])
+
+        # Unpack to RGB one channel at a time (much faster than copying a
+        # strided view of the RGBA bytes).
+        out = np.empty((h, w, 3), dtype=np.uint8)
+        out[:, :, 0] = inner
+        out[:, :, 1] = inner >> 8
+        out[:, :, 2] = inner >> 16
+        return out
+
+    def image(self, text):
+        # Blur
+        return Image.fromarray(smooth(self.render(text)))
+
+    def png(self, text, level=1):
+        return encode_png(smooth(self.render(text)), level)
+
+# --- Benchmark against 2_Captch.py ---
+def benchmark(count=2000):
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("captcha_reference", os.path.join(os.path.dirname(os.path.abspath(__file__)), "2_Captch.py"))
+    reference = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(reference)
+
+    start = time.perf_counter()
+    for _ in range(count // 10):
+        reference.generate_captcha(reference.random_text())
+    reference_rate = (count // 10) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    renderer = CaptchaRenderer(seed=1)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        renderer.image(renderer.random_text())
+    image_rate = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        renderer.png(renderer.random_text())
+    png_rate = count / (time.perf_counter() - start)
+
+    print(f"2_Captch.generate_captcha : {reference_rate:8.0f} images/s")
+    print(f"CaptchaRenderer.image     : {image_rate:8.0f} images/s (glyph cache built in {setup * 1000:.0f} ms)")
+    print(f"CaptchaRenderer.png       : {png_rate:8.0f} images/s")
+
+# --- Main ---
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--benchmark"]:
+        benchmark(*(int(arg) for arg in sys.argv[2:3]))
+    else:
+        renderer = CaptchaRenderer()
+        code = renderer.random_text()
+        renderer.image(code).save("captcha_fast.png")
+        print(f"CAPTCHA {code} saved to: captcha_fast.png")
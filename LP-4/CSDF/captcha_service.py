@@ -0,0 +1,314 @@
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from captcha_fast import CHARS, LENGTH, CaptchaRenderer
+
+# CAPTCHA service for login pages, the served version of 2_Captch.py.
+# Worker processes render challenges with captcha_fast.CaptchaRenderer in
+# batches, and a producer thread keeps a bounded queue of ready
+# (id, PNG bytes, answer hash) entries topped up. Issuing a challenge only
+# takes the next entry off the queue, so it never waits for a render. The
+# plain answer never leaves the producer: the store keeps an HMAC of
+# (id, answer) under a per-process key, each entry expires after TTL
+# seconds and is removed on its first verification attempt, right or wrong.
+# A small HTTP server stands in for the login page for testing.
+
+POOL_SIZE = 1000
+BATCH_SIZE = 50
+TTL = 120
+HOST = "127.0.0.1"
+PORT = 8025
+RETRY_DELAY = 1.0
+
+RENDERER = None
+
+# --- Rendering (worker processes) ---
+def init_worker():
+    global RENDERER
+    RENDERER = CaptchaRenderer()
+
+def render_batch(count, length=LENGTH):
+    # Answers come from secrets rather than the renderer's NumPy generator.
+    batch = []
+    for _ in range(count):
+        answer = "".join(secrets.choice(CHARS) for _ in range(length))
+        batch.append((answer, RENDERER.png(answer)))
+    return batch
+
+# --- Verification store ---
+class ChallengeStore:
+
+    def __init__(self, ttl=TTL, key=None):
+        self.ttl = ttl
+        self.key = key or secrets.token_bytes(32)
+        # id -> (expiry, answer hash). Every entry gets the same TTL, so
+        # insertion order is expiry order and expired entries are always at
+        # the front.
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def digest(self, challenge_id, answer):
+        message = f"{challenge_id}:{answer.strip().upper()}".encode("utf-8")
+        return hmac.new(self.key, message, hashlib.sha256).digest()
+
+    def expire(self, now):
+        while self.entries:
+            if next(iter(self.entries.values()))[0] > now:
+                break
+            self.entries.popitem(last=False)
+
+    def add(self, challenge_id, answer_hash):
+        now = time.monotonic()
+        with self.lock:
+            self.expire(now)
+            self.entries[challenge_id] = (now + self.ttl, answer_hash)
+
+    def verify(self, challenge_id, answer):
+        # Single use: the entry is removed whatever the answer.
+        expected = self.digest(challenge_id, answer)
+        with self.lock:
+            entry = self.entries.pop(challenge_id, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return False
+        return hmac.compare_digest(entry[1], expected)
+
+    def __len__(self):
+        with self.lock:
+            self.expire(time.monotonic())
+            return len(self.entries)
+
+# --- Service ---
+class CaptchaService:
+
+    def __init__(self, pool_size=POOL_SIZE, workers=None, batch_size=BATCH_SIZE, ttl=TTL):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.ready = queue.Queue(maxsize=pool_size)
+        self.store = ChallengeStore(ttl)
+        self.stopped = threading.Event()
+        self.producer = threading.Thread(target=self.produce, daemon=True)
+
+    def start(self):
+        self.producer.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.producer.join()
+
+    def produce(self):
+        # Runs until stop(). A pool whose worker died is replaced.
+        while not self.stopped.is_set():
+            try:
+                self.produce_with_pool()
+            except BrokenProcessPool as e:
+                print(f"captcha_service: render pool broke ({e}), restarting it", file=sys.stderr)
+                self.stopped.wait(RETRY_DELAY)
+
+    def produce_with_pool(self):
+        # Keeps two batches per worker in flight; results wait on the bounded
+        # queue, so at most pool_size + 2 * workers * batch_size challenges
+        # exist at once.
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker) as pool:
+            pending = deque()
+            while not self.stopped.is_set():
+                while len(pending) < 2 * self.workers:
+                    pending.append(pool.submit(render_batch, self.batch_size))
+                try:
+                    batch = pending.popleft().result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    # The failed batch is resubmitted at the top of the loop;
+                    # the delay keeps a persistent error from spinning.
+                    print(f"captcha_service: render batch failed ({e!r}), retrying", file=sys.stderr)
+                    self.stopped.wait(RETRY_DELAY)
+                    continue
+                for answer, png in batch:
+                    challenge_id = secrets.token_urlsafe(16)
+                    item = (challenge_id, png, self.store.digest(challenge_id, answer))
+                    while not self.stopped.is_set():
+                        try:
+                            self.ready.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+            for future in pending:
+                future.cancel()
+
+    def wait_full(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.ready.full():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def issue(self):
+        # (id, PNG bytes), or None when the pool has run dry.
+        try:
+            challenge_id, png, answer_hash = self.ready.get_nowait()
+        except queue.Empty:
+            return None
+        self.store.add(challenge_id, answer_hash)
+        return challenge_id, png
+
+    def verify(self, challenge_id, answer):
+        return self.store.verify(challenge_id, answer)
+
+    def stats(self):
+        return {"ready": self.ready.qsize(), "pending": len(self.store), "workers": self.workers}
+
+# --- HTTP stand-in ---
+LOGIN_PAGE = """<!doctype html>
+<title>Login</title>
+<form method="post" action="/verify">
+  <img src="data:image/png;base64,{png}" alt="CAPTCHA"><br>
+  <input type="hidden" name="id" value="{id}">
+  <input name="answer" autocomplete="off" autofocus>
+  <button>Verify</button>
+</form>
+"""
+
+class CaptchaHandler(BaseHTTPRequestHandler):
+    # GET /          login form with an embedded challenge
+    # GET /captcha   PNG body, challenge id in the X-Captcha-Id header
+    # POST /verify   id and answer, as JSON or a form -> {"valid": ...}
+    # GET /stats     queue and store sizes
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes on a keep-alive connection.
+    disable_nagle_algorithm = True
+
+    def send(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, value):
+        self.send(status, json.dumps(value).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/stats":
+            return self.send_json(200, service.stats())
+        if self.path not in ("/", "/captcha"):
+            return self.send_json(404, {"error": "not found"})
+        challenge = service.issue()
+        if challenge is None:
+            body = json.dumps({"error": "no challenge ready"}).encode("utf-8")
+            return self.send(503, body, "application/json", [("Retry-After", "1")])
+        challenge_id, png = challenge
+        if self.path == "/captcha":
+            return self.send(200, png, "image/png", [("X-Captcha-Id", challenge_id)])
+        page = LOGIN_PAGE.format(png=base64.b64encode(png).decode("ascii"), id=challenge_id)
+        self.send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+
+    def do_POST(self):
+        if self.path != "/verify":
+            return self.send_json(404, {"error": "not found"})
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            try:
+                fields = json.loads(body)
+            except ValueError:
+                return self.send_json(400, {"error": "invalid JSON"})
+        else:
+            fields = {name: values[0] for name, values in parse_qs(body.decode("utf-8", "replace")).items()}
+        if not isinstance(fields, dict):
+            return self.send_json(400, {"error": "expected an object"})
+        challenge_id, answer = fields.get("id"), fields.get("answer")
+        if not isinstance(challenge_id, str) or not isinstance(answer, str):
+            return self.send_json(400, {"error": "id and answer are required"})
+        self.send_json(200, {"valid": self.server.service.verify(challenge_id, answer)})
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(service, host=HOST, port=PORT):
+    server = ThreadingHTTPServer((host, port), CaptchaHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+# --- Benchmark ---
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+    return f"p50 {pick(0.50):8.1f} us  p99 {pick(0.99):8.1f} us  max {samples[-1] * 1e6:8.1f} us"
+
+def benchmark(count=POOL_SIZE, workers=None):
+    init_worker()
+    render = []
+    for _ in range(200):
+        start = time.perf_counter()
+        render_batch(1)
+        render.append(time.perf_counter() - start)
+
+    service = CaptchaService(pool_size=count, workers=workers).start()
+    service.wait_full()
+    issue, misses = [], 0
+    for _ in range(count):
+        start = time.perf_counter()
+        challenge = service.issue()
+        issue.append(time.perf_counter() - start)
+        if challenge is None:
+            misses += 1
+        elif service.verify(challenge[0], "") or service.verify(challenge[0], ""):
+            raise AssertionError("empty answer verified")
+
+    service.wait_full()
+    server = serve(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection(HOST, server.server_address[1])
+    requests = []
+    for _ in range(count):
+        start = time.perf_counter()
+        conn.request("GET", "/captcha")
+        response = conn.getresponse()
+        response.read()
+        requests.append(time.perf_counter() - start)
+        misses += response.status != 200
+    conn.close()
+    server.shutdown()
+    service.stop()
+
+    print(f"render + PNG (one process): {percentiles(render)}")
+    print(f"issue()                   : {percentiles(issue)}")
+    print(f"GET /captcha              : {percentiles(requests)}")
+    print(f"{2 * count} challenges issued, {misses} with an empty pool")
+
+# --- Main ---
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--benchmark"]:
+        benchmark(*(int(arg) for arg in sys.argv[2:4]))
+    else:
+        port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+        service = CaptchaService().start()
+        server = serve(service, port=port)
+        print(f"CAPTCHA service on http://{HOST}:{port}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.stop()
@@ -0,0 +1,270 @@
+import csv
+import json
+import os
+import random
+import socket
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+# IP enrichment for addresses found in Received headers. A local CIDR
+# dataset (CSV with network, asn, country and as_name columns) is loaded
+# once into a sorted-interval index: nested networks are flattened into
+# disjoint [start, end] ranges, the most specific network winning, and kept
+# as packed integer arrays searched with bisect. The index is saved next to
+# the dataset (<dataset>.idx, or index_path) and reused until the CSV
+# changes. Each lookup also reports the address scope (private, loopback, documentation, reserved, ...) from
+# a second index of the special-purpose ranges, and results are
+# memoized in an LRU cache since the same relays show up in many messages.
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ip_asn_sample.csv")
+CACHE_SIZE = 1 << 16
+INDEX_SUFFIX = ".idx"
+
+# IANA special-purpose ranges; anything not listed here is 'global'.
+SPECIAL_RANGES = [
+    ('0.0.0.0/8', 'reserved'),
+    ('0.0.0.0/32', 'unspecified'),
+    ('10.0.0.0/8', 'private'),
+    ('100.64.0.0/10', 'shared'),
+    ('127.0.0.0/8', 'loopback'),
+    ('169.254.0.0/16', 'link-local'),
+    ('172.16.0.0/12', 'private'),
+    ('192.0.0.0/24', 'reserved'),
+    ('192.0.2.0/24', 'documentation'),
+    ('192.88.99.0/24', 'reserved'),
+    ('192.168.0.0/16', 'private'),
+    ('198.18.0.0/15', 'benchmarking'),
+    ('198.51.100.0/24', 'documentation'),
+    ('203.0.113.0/24', 'documentation'),
+    ('224.0.0.0/4', 'multicast'),
+    ('240.0.0.0/4', 'reserved'),
+    ('255.255.255.255/32', 'broadcast'),
+    ('::/128', 'unspecified'),
+    ('::1/128', 'loopback'),
+    ('::ffff:0:0/96', 'ipv4-mapped'),
+    ('64:ff9b::/96', 'reserved'),
+    ('100::/64', 'reserved'),
+    ('2001::/23', 'reserved'),
+    ('2001:db8::/32', 'documentation'),
+    ('fc00::/7', 'private'),
+    ('fe80::/10', 'link-local'),
+    ('ff00::/8', 'multicast'),
+]
+
+# --- Address parsing ---
+def ip_to_int(ip):
+    # Returns (version, integer) or None for anything that is not an address.
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except OSError:
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+    except OSError:
+        return None
+
+def network_range(network):
+    # "a.b.c.d/n" or "x::/n" -> (version, first, last, canonical network).
+    address, _, prefix = network.strip().partition('/')
+    parsed = ip_to_int(address)
+    if parsed is None:
+        raise ValueError(f"invalid network {network!r}")
+    version, value = parsed
+    bits = 32 if version == 4 else 128
+    prefix = int(prefix) if prefix else bits
+    if not 0 <= prefix <= bits:
+        raise ValueError(f"invalid prefix length in {network!r}")
+    host = (1 << (bits - prefix)) - 1
+    start = value & ~host
+    family = socket.AF_INET if version == 4 else socket.AF_INET6
+    return version, start, start | host, f"{socket.inet_ntop(family, start.to_bytes(bits // 8, 'big'))}/{prefix}"
+
+# --- Index ---
+def flatten(ranges):
+    # ranges: [(start, end, value)] of CIDR blocks, which are either nested
+    # or disjoint. Returns disjoint (start, end, value) ranges in order,
+    # each point keeping the value of the smallest block containing it.
+    ranges.sort(key=lambda r: (r[0], -r[1]))
+    out = []
+    stack = []
+    cursor = 0
+
+    def emit(start, end, value):
+        if start <= end:
+            out.append((start, end, value))
+
+    for start, end, value in ranges:
+        while stack and stack[-1][0] < start:
+            top_end, top_value = stack.pop()
+            emit(cursor, top_end, top_value)
+            cursor = max(cursor, top_end + 1)
+        if stack:
+            emit(cursor, start - 1, stack[-1][1])
+        cursor = start
+        stack.append((end, value))
+    while stack:
+        top_end, top_value = stack.pop()
+        emit(cursor, top_end, top_value)
+        cursor = max(cursor, top_end + 1)
+    return out
+
+class IpIndex:
+
+    def __init__(self, rows=()):
+        # rows: iterable of (network, record); find() returns the record
+        # index of the most specific network containing an address.
+        self.networks = []
+        self.records = []
+        ranges = {4: [], 6: []}
+        for network, record in rows:
+            version, start, end, network = network_range(network)
+            ranges[version].append((start, end, len(self.records)))
+            self.networks.append(network)
+            self.records.append(record)
+
+        # IPv4 bounds fit in uint32 arrays; IPv6 bounds stay as Python ints.
+        flat4 = flatten(ranges[4])
+        self.starts4 = array('I', (r[0] for r in flat4))
+        self.ends4 = array('I', (r[1] for r in flat4))
+        self.values4 = array('I', (r[2] for r in flat4))
+        flat6 = flatten(ranges[6])
+        self.starts6 = [r[0] for r in flat6]
+        self.ends6 = [r[1] for r in flat6]
+        self.values6 = array('I', (r[2] for r in flat6))
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = csv.DictReader(row for row in f if not row.startswith('#'))
+            return cls((row['network'], (int(row['asn']) if row.get('asn') else None,
+                                         row.get('country') or None, row.get('as_name') or None)) for row in rows)
+
+    @classmethod
+    def load(cls, path, index_path=None):
+        # Uses the packed index (by default saved next to the dataset) while
+        # it is up to date, otherwise builds it from the CSV and saves it for
+        # next time.
+        index_path = index_path or path + INDEX_SUFFIX
+        stat = os.stat(path)
+        source = [stat.st_size, stat.st_mtime_ns]
+        try:
+            return cls.read_packed(index_path, source)
+        except (OSError, ValueError):
+            pass
+        index = cls.from_csv(path)
+        try:
+            index.write_packed(index_path, source)
+        except OSError:
+            pass
+        return index
+
+    def write_packed(self, path, source):
+        # A JSON header line (source size/mtime, counts, networks, records)
+        # followed by the raw range arrays.
+        header = {'source': source, 'n4': len(self.starts4), 'n6': len(self.starts6),
+                  'networks': self.networks, 'records': self.records}
+        # Written under a temporary name and renamed, so parallel workers
+        # never read a half-written index.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for values in (self.starts4, self.ends4, self.values4, self.values6):
+                f.write(values.tobytes())
+            for bounds in (self.starts6, self.ends6):
+                f.write(b''.join(value.to_bytes(16, 'big') for value in bounds))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read_packed(cls, path, source):
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            if header['source'] != source:
+                raise ValueError("index is out of date")
+            index = cls()
+            index.networks = header['networks']
+            index.records = [tuple(record) if isinstance(record, list) else record for record in header['records']]
+            n4, n6 = header['n4'], header['n6']
+            for name, count in (('starts4', n4), ('ends4', n4), ('values4', n4), ('values6', n6)):
+                values = array('I')
+                values.frombytes(f.read(4 * count))
+                setattr(index, name, values)
+            for name in ('starts6', 'ends6'):
+                data = f.read(16 * n6)
+                setattr(index, name, [int.from_bytes(data[i:i + 16], 'big') for i in range(0, len(data), 16)])
+        return index
+
+    def find(self, version, value):
+        # Index into self.records of the most specific network, or None.
+        if version == 4:
+            starts, ends, values = self.starts4, self.ends4, self.values4
+        else:
+            starts, ends, values = self.starts6, self.ends6, self.values6
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return values[i]
+        return None
+
+class IpEnricher:
+
+    def __init__(self, index=None, cache_size=CACHE_SIZE):
+        self.index = index or IpIndex()
+        self.scopes = SCOPE_INDEX
+        self.lookup = lru_cache(maxsize=cache_size)(self.lookup_uncached)
+
+    @classmethod
+    def load(cls, path=DATASET, cache_size=CACHE_SIZE, index_path=None):
+        return cls(IpIndex.load(path, index_path), cache_size)
+
+    def lookup_uncached(self, ip):
+        # lookup() returns the cached dict itself; copy it before changing it.
+        info = {'ip': ip, 'network': None, 'asn': None, 'country': None, 'as_name': None, 'scope': 'invalid'}
+        parsed = ip_to_int(ip)
+        if parsed is None:
+            return info
+        special = self.scopes.find(*parsed)
+        info['scope'] = 'global' if special is None else self.scopes.records[special]
+        found = self.index.find(*parsed)
+        if found is not None:
+            info['network'] = self.index.networks[found]
+            info['asn'], info['country'], info['as_name'] = self.index.records[found]
+        return info
+
+    def enrich(self, record):
+        # Adds an 'ip_info' list to a mail_triage record, one entry per IP.
+        record['ip_info'] = [self.lookup(ip) for ip in record['ips']]
+        return record
+
+SCOPE_INDEX = IpIndex(SPECIAL_RANGES)
+
+# --- Benchmark ---
+def benchmark(path=DATASET, count=200000):
+    rng = random.Random(1)
+    enricher = IpEnricher.load(path)
+    ips = ['%d.%d.%d.%d' % tuple(rng.randint(0, 255) for _ in range(4)) for _ in range(count)]
+
+    start = time.perf_counter()
+    for ip in ips:
+        enricher.lookup_uncached(ip)
+    uncached = time.perf_counter() - start
+
+    repeated = [ips[rng.randrange(1000)] for _ in range(count)]
+    start = time.perf_counter()
+    for ip in repeated:
+        enricher.lookup(ip)
+    cached = time.perf_counter() - start
+
+    print(f"{len(enricher.index.records)} networks, {len(enricher.index.starts4) + len(enricher.index.starts6)} ranges")
+    print(f"uncached lookup: {uncached / count * 1e6:.2f} us/ip")
+    print(f"cached lookup (1000 distinct): {cached / count * 1e6:.2f} us/ip")
+
+# --- Main ---
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--benchmark']:
+        benchmark(*sys.argv[2:3])
+    else:
+        enricher = IpEnricher.load(sys.argv[1] if len(sys.argv) > 1 else DATASET)
+        for ip in sys.argv[2:] or ['192.168.1.10', '203.0.113.5', '8.8.8.8', '1.1.1.1', '100.64.0.1']:
+            print(enricher.lookup(ip))
@@ -0,0 +1,257 @@
+import csv
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ip_enrich import IpEnricher
+
+# Bulk header triage for mbox and Maildir archives, the batch version of
+# 1_Email_Header.py. Only the header block of each message is read: mbox
+# bodies are skipped with bytes.find over large reads, and Maildir files are
+# read only up to the first blank line. Header blocks are parsed in worker
+# processes in batches, and one record per message (From/To/Subject/Date,
+# the Received hop chain and the IPs in it) is streamed out as JSONL or CSV
+# in archive order. With a CIDR dataset, each worker also enriches the IPs
+# through ip_enrich.IpEnricher.
+
+READ_SIZE = 1 << 22
+BATCH_SIZE = 2000
+
+IPV4_PATTERN = re.compile(rb'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')
+IPV6_PATTERN = re.compile(rb'\[IPv6:([0-9A-Fa-f:.]+)\]')
+HEADER_END = re.compile(rb'\n\r?\n')
+HOP_PATTERN = re.compile(rb'\s*from\s+([^\s;]+)(?:.*?\bby\s+([^\s;]+))?', re.IGNORECASE | re.DOTALL)
+
+FIELDS = {b'from': 'from', b'to': 'to', b'subject': 'subject', b'date': 'date', b'message-id': 'message_id'}
+CSV_COLUMNS = ['id', 'from', 'to', 'subject', 'date', 'message_id', 'hops', 'ips', 'ip_info']
+
+ENRICHER = None
+
+# --- Reading header blocks ---
+def header_end(data, start):
+    # Offset just past the blank line that ends the header block, or -1.
+    match = HEADER_END.search(data, start)
+    return match.end() if match else -1
+
+def iter_mbox_headers(path, read_size=READ_SIZE):
+    # Yields (byte offset of the "From " line, header block) per message.
+    with open(path, 'rb') as f:
+        data = f.read(read_size)
+        eof = len(data) < read_size
+        base = 0
+        pos = 0 if data.startswith(b'From ') else data.find(b'\nFrom ')
+        if pos > 0:
+            pos += 1
+
+        while pos != -1:
+            # pos is the start of a "From " line; read until the header ends.
+            end = header_end(data, pos)
+            while end == -1 and not eof:
+                more = f.read(read_size)
+                eof = len(more) < read_size
+                data = data[pos:] + more
+                base += pos
+                pos = 0
+                end = header_end(data, pos)
+            if end == -1:
+                end = len(data)
+
+            line_end = data.find(b'\n', pos) + 1 or end
+            yield base + pos, data[line_end:end]
+
+            # Skip the body up to the next "From " line. The blank line's
+            # newline and the last few bytes are kept across reads so a
+            # separator split between two reads is still found.
+            nxt = data.find(b'\nFrom ', end - 1)
+            while nxt == -1 and not eof:
+                keep = max(end - 1, len(data) - 5)
+                more = f.read(read_size)
+                eof = len(more) < read_size
+                data = data[keep:] + more
+                base += keep
+                end = 1
+                nxt = data.find(b'\nFrom ')
+            pos = nxt + 1 if nxt != -1 else -1
+
+def read_header_file(path, read_size=64 * 1024):
+    with open(path, 'rb') as f:
+        data = b''
+        while True:
+            chunk = f.read(read_size)
+            data += chunk
+            end = header_end(b'\n' + data, 0)
+            if end != -1:
+                return data[:end - 1]
+            if not chunk:
+                return data
+
+def iter_maildir_paths(path):
+    for sub in ('cur', 'new'):
+        folder = os.path.join(path, sub)
+        if os.path.isdir(folder):
+            with os.scandir(folder) as entries:
+                for entry in sorted(entries, key=lambda e: e.name):
+                    if entry.is_file() and not entry.name.startswith('.'):
+                        yield entry.path
+
+# --- Parsing ---
+def decode(value):
+    return value.decode('utf-8', 'replace')
+
+def parse_headers(block):
+    # Unfolds continuation lines; returns [(lowercase name, raw value)].
+    headers = []
+    for line in block.split(b'\n'):
+        if line[:1] in (b' ', b'\t'):
+            if headers:
+                headers[-1][1].append(line.strip())
+            continue
+        name, sep, value = line.partition(b':')
+        if sep:
+            headers.append((name.strip().lower(), [value.strip()]))
+    return [(name, b' '.join(parts)) for name, parts in headers]
+
+def parse_hop(value):
+    match = HOP_PATTERN.match(value)
+    route, _, date = value.rpartition(b';')
+    ips = IPV4_PATTERN.findall(value)
+    if b'[IPv6:' in value:
+        ips += IPV6_PATTERN.findall(value)
+    return {
+        'from': decode(match.group(1)) if match else None,
+        'by': decode(match.group(2)) if match and match.group(2) else None,
+        'date': decode(date.strip()) if route else None,
+        'ips': [ip.decode('ascii') for ip in ips],
+    }
+
+def analyze_header(message_id, block):
+    record = {'id': message_id, 'from': None, 'to': None, 'subject': None, 'date': None, 'message_id': None}
+    hops = []
+    for name, value in parse_headers(block):
+        if name == b'received':
+            hops.append(parse_hop(value))
+        elif name in FIELDS and record[FIELDS[name]] is None:
+            record[FIELDS[name]] = decode(value)
+    record['received'] = hops
+    record['ips'] = list(dict.fromkeys(ip for hop in hops for ip in hop['ips']))
+    return record
+
+def init_worker(ip_data):
+    global ENRICHER
+    ENRICHER = IpEnricher.load(ip_data) if ip_data else None
+
+def finish(record):
+    return ENRICHER.enrich(record) if ENRICHER else record
+
+def analyze_batch(batch):
+    return [finish(analyze_header(message_id, block)) for message_id, block in batch]
+
+def analyze_path_batch(paths):
+    return [finish(analyze_header(os.path.basename(path), read_header_file(path))) for path in paths]
+
+# --- Fan-out ---
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def analyze_archive(path, workers=None, batch_size=BATCH_SIZE, ip_data=None):
+    # Yields one record per message, in archive order. At most a few batches
+    # per worker are in flight, so memory stays flat for any archive size.
+    if os.path.isdir(path):
+        work, tasks = analyze_path_batch, batches(iter_maildir_paths(path), batch_size)
+    else:
+        work, tasks = analyze_batch, batches(iter_mbox_headers(path), batch_size)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        init_worker(ip_data)
+        for batch in tasks:
+            yield from work(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(ip_data,)) as pool:
+        pending = deque()
+        for batch in tasks:
+            pending.append(pool.submit(work, batch))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# --- Output ---
+def write_jsonl(records, out):
+    count = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+def write_csv(records, out):
+    # One row per message; hops are "from>by" joined with " | ", and
+    # ip_info entries are "ip/scope/asn/country".
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    count = 0
+    for record in records:
+        hops = ' | '.join(f"{hop['from'] or ''}>{hop['by'] or ''}" for hop in record['received'])
+        info = ' '.join(f"{i['ip']}/{i['scope']}/{i['asn'] or ''}/{i['country'] or ''}" for i in record.get('ip_info', ()))
+        writer.writerow([record['id'], record['from'], record['to'], record['subject'], record['date'],
+                         record['message_id'], hops, ' '.join(record['ips']), info])
+        count += 1
+    return count
+
+def triage(path, out_path='-', workers=None, ip_data=None):
+    records = analyze_archive(path, workers, ip_data=ip_data)
+    write = write_csv if out_path.endswith('.csv') else write_jsonl
+    start = time.perf_counter()
+    if out_path == '-':
+        count = write(records, sys.stdout)
+    else:
+        with open(out_path, 'w', newline='', encoding='utf-8') as out:
+            count = write(records, out)
+    elapsed = time.perf_counter() - start
+    print(f"{count} messages in {elapsed:.2f} s ({count / max(elapsed, 1e-9):.0f} msgs/s)", file=sys.stderr)
+    return count
+
+# --- Synthetic archive for benchmarking ---
+def generate_mbox(path, count, seed=1):
+    rng = random.Random(seed)
+    body_line = b'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod.\n'
+    with open(path, 'wb') as f:
+        for n in range(count):
+            hops = []
+            for h in range(rng.randint(1, 5)):
+                ip = '.'.join(str(rng.randint(1, 254)) for _ in range(4))
+                hops.append(f"Received: from relay{h}.example.net (relay{h}.example.net [{ip}])\n"
+                            f"    by mx{h}.example.com with ESMTP id {n:x}{h}\n"
+                            f"    for <user{n}@example.com>; Wed, 25 Sep 2025 10:{h:02d}:00 +0530\n")
+            f.write(f"From sender{n}@example.org Wed Sep 25 10:30:00 2025\n".encode())
+            f.write(''.join(hops).encode())
+            f.write(f"From: sender{n}@example.org\nTo: user{n}@example.com\n"
+                    f"Subject: Message {n}\nDate: Wed, 25 Sep 2025 10:30:00 +0530\n"
+                    f"Message-ID: <{n}@example.org>\n\n".encode())
+            f.write(body_line * rng.randint(5, 200))
+            f.write(b'\n')
+
+# --- Main ---
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--generate']:
+        generate_mbox(sys.argv[3], int(sys.argv[2]))
+    elif len(sys.argv) > 1:
+        triage(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else '-',
+               int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] != '0' else None,
+               sys.argv[4] if len(sys.argv) > 4 else None)
+    else:
+        print("usage: mail_triage.py ARCHIVE [OUT.jsonl|OUT.csv|-] [WORKERS|0] [IP_DATASET.csv]")
+        print("       mail_triage.py --generate COUNT OUT.mbox")
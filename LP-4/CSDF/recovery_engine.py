@@ -0,0 +1,364 @@
+import errno
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Recovery engine for 4_recovery.py. Files ending in .deleted are found with
+# a sorted scandir walk and copied by a bounded thread pool. Each copy
+# runs in the kernel when it can (os.copy_file_range, then os.sendfile),
+# falling back to a read/write loop. The source is hashed chunk by chunk
+# while it is copied and, with verify on, the result is read back and
+# checked. Copies are written as <name>.part and renamed into place, and each
+# finished file is appended to a JSONL manifest in the output folder. A
+# rerun skips every file the manifest lists as recovered, if the source is
+# unchanged and the copy is still there. Names are never overwritten: a second
+# "report.txt" from another folder becomes "report (2).txt".
+
+SUFFIX = ".deleted"
+MANIFEST = ".recovery_manifest.jsonl"
+PART_SUFFIX = ".part"
+CHUNK = 1 << 20
+BATCH_SIZE = 64
+# Kernel copy methods this platform has (copy_file_range is Linux-only,
+# sendfile is missing on Windows); "read" works everywhere.
+METHODS = tuple(m for m in ("copy_file_range", "sendfile") if hasattr(os, m)) + ("read",)
+
+# Errors that mean a kernel copy method does not work for these files
+# (unsupported filesystem, cross-device, missing syscall, sendfile that
+# only writes to sockets); anything else is a real I/O error.
+UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTSOCK}
+
+# --- Scanning and naming ---
+def scan(source, suffix=SUFFIX):
+    # Yields (path relative to source, path, stat) in sorted order, so
+    # names are handed out the same way on every run.
+    prefix = len(os.path.join(source, ""))
+    stack = [source]
+    while stack:
+        folder = stack.pop()
+        # Unreadable folders are skipped, as os.walk does.
+        try:
+            with os.scandir(folder) as entries:
+                entries = sorted(entries, key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in reversed(entries):
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+        for entry in entries:
+            if entry.name.endswith(suffix) and entry.is_file(follow_symlinks=False):
+                yield entry.path[prefix:], entry.path, entry.stat(follow_symlinks=False)
+
+def recovered_name(name, suffix=SUFFIX):
+    return name[:-len(suffix)] if suffix and name.endswith(suffix) else name
+
+def unique_name(name, taken):
+    # "name.ext", then "name (2).ext", "name (3).ext", ...; reserves the
+    # result in taken.
+    candidate = name
+    stem, ext = os.path.splitext(name)
+    n = 1
+    while candidate in taken or candidate.endswith(PART_SUFFIX) or candidate == MANIFEST:
+        n += 1
+        candidate = f"{stem} ({n}){ext}"
+    taken.add(candidate)
+    return candidate
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# --- Copying ---
+def write_all(f, data):
+    # Unbuffered writes may be partial.
+    while data:
+        data = data[f.write(data):]
+
+def copy_kernel(method, fin, fout, digest, buf):
+    # Copies to EOF with copy_file_range or sendfile, given explicit source
+    # offsets so the source file position does not move. Each range copied
+    # is then read from the source, still in the page cache, into buf and
+    # hashed, which keeps the file position in step with offset.
+    view = memoryview(buf)
+    fi, fo = fin.fileno(), fout.fileno()
+    offset = 0
+    while True:
+        if method == "copy_file_range":
+            copied = os.copy_file_range(fi, fo, CHUNK, offset, offset)
+        else:
+            copied = os.sendfile(fo, fi, offset, CHUNK)
+        if copied == 0:
+            return offset
+        end = offset + copied
+        while offset < end:
+            got = fin.readinto(view[:end - offset])
+            if not got:
+                raise OSError(errno.EIO, "source shrank while it was copied", fin.name)
+            digest.update(view[:got])
+            offset += got
+
+def copy_read(fin, fout, digest, buf):
+    # Plain read/write loop to EOF, hashing each chunk.
+    view = memoryview(buf)
+    offset = 0
+    while True:
+        got = fin.readinto(view)
+        if not got:
+            return offset
+        digest.update(view[:got])
+        write_all(fout, view[:got])
+        offset += got
+
+def discard(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def file_digest(path, buf):
+    digest = hashlib.sha256()
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            got = f.readinto(view)
+            if not got:
+                return digest.hexdigest()
+            digest.update(view[:got])
+
+class RecoveryEngine:
+
+    def __init__(self, source, dest, workers=None, suffix=SUFFIX, verify=True, recheck=False, methods=METHODS):
+        self.source = source
+        self.dest = dest
+        self.workers = workers or min(32, 4 * (os.cpu_count() or 1))
+        self.suffix = suffix
+        self.verify = verify
+        self.recheck = recheck
+        # Kernel methods are dropped from this tuple the first time they turn
+        # out not to work here; "read" always works and stays last.
+        self.methods = tuple(m for m in methods if m != "read" and hasattr(os, m)) + ("read",)
+        self.manifest_path = os.path.join(dest, MANIFEST)
+        self.log_lock = threading.Lock()
+        self.local = threading.local()
+
+    def buffer(self):
+        # One reusable chunk buffer per thread.
+        buf = getattr(self.local, "buf", None)
+        if buf is None:
+            buf = self.local.buf = bytearray(CHUNK)
+        return buf
+
+    # --- Manifest ---
+    def load_manifest(self):
+        # source path -> last record. A line cut short by an interrupted run
+        # is ignored; that file is simply copied again.
+        done = {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    done[record["source"]] = record
+        except FileNotFoundError:
+            pass
+        return done
+
+    def log_ends_with_newline(self):
+        with open(self.manifest_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def is_recovered(self, record, st):
+        # The manifest entry still describes this source, and the copy is
+        # there with the right size (and hash, with recheck on).
+        if record["size"] != st.st_size or record["mtime_ns"] != st.st_mtime_ns:
+            return False
+        path = os.path.join(self.dest, record["dest"])
+        try:
+            if os.stat(path).st_size != record["size"]:
+                return False
+        except OSError:
+            return False
+        return not self.recheck or file_digest(path, self.buffer()) == record["sha256"]
+
+    # --- Recovering files ---
+    def copy(self, path, target):
+        # Returns (bytes copied, sha256 hex, method used).
+        buf = self.buffer()
+        digest = hashlib.sha256()
+        with open(path, "rb", buffering=0) as fin, open(target, "wb", buffering=0) as fout:
+            for method in self.methods:
+                if method == "read":
+                    size = copy_read(fin, fout, digest, buf)
+                    break
+                try:
+                    size = copy_kernel(method, fin, fout, digest, buf)
+                    break
+                except OSError as e:
+                    if e.errno not in UNSUPPORTED:
+                        raise
+                    # Start over with the next method.
+                    self.methods = tuple(m for m in self.methods if m != method)
+                    digest = hashlib.sha256()
+                    fin.seek(0)
+                    fout.seek(0)
+                    fout.truncate()
+        # Mode and timestamps, as shutil.copy2 did.
+        shutil.copystat(path, target)
+        return size, digest.hexdigest(), method
+
+    def recover_batch(self, batch):
+        # batch: [(rel, path, name, stat)] -> [(rel, record or OSError)].
+        results = []
+        copied = []
+        for rel, path, name, st in batch:
+            part = os.path.join(self.dest, name + PART_SUFFIX)
+            try:
+                size, sha256, method = self.copy(path, part)
+                if self.verify and file_digest(part, self.buffer()) != sha256:
+                    raise OSError(errno.EIO, "copy does not match the source hash", path)
+            except OSError as e:
+                discard(part)
+                results.append((rel, e))
+                continue
+            record = {"source": rel, "dest": name, "size": size, "mtime_ns": st.st_mtime_ns,
+                      "sha256": sha256, "verified": self.verify, "method": method}
+            copied.append((len(results), part))
+            results.append((rel, record))
+
+        # Logged before the renames: if the run is killed in between, the
+        # resumed run sees the records, finds no copies and redoes them
+        # under the same names instead of picking new ones.
+        if copied:
+            with self.log_lock:
+                self.log.write("".join(json.dumps(results[i][1]) + "\n" for i, _ in copied))
+                self.log.flush()
+        for i, part in copied:
+            rel, record = results[i]
+            try:
+                os.replace(part, os.path.join(self.dest, record["dest"]))
+            except OSError as e:
+                discard(part)
+                results[i] = (rel, e)
+        return results
+
+    # --- Run ---
+    def run(self, report=None):
+        # report(rel, record or exception) is called for every copied or
+        # failed file, in scan order. Returns a summary dict.
+        os.makedirs(self.dest, exist_ok=True)
+        done = self.load_manifest()
+        taken = {name for name in os.listdir(self.dest) if not name.endswith(PART_SUFFIX)}
+        taken.update(record["dest"] for record in done.values())
+        stats = {"recovered": 0, "skipped": 0, "failed": 0, "bytes": 0}
+        start = time.perf_counter()
+
+        def todo():
+            for rel, path, st in scan(self.source, self.suffix):
+                record = done.get(rel)
+                if record is not None and self.is_recovered(record, st):
+                    stats["skipped"] += 1
+                    continue
+                # A source that changed since it was recovered is copied
+                # again over its own earlier copy, never over another file.
+                name = record["dest"] if record else unique_name(recovered_name(os.path.basename(rel), self.suffix), taken)
+                yield rel, path, name, st
+
+        def finish(future):
+            for rel, result in future.result():
+                if isinstance(result, OSError):
+                    stats["failed"] += 1
+                else:
+                    stats["recovered"] += 1
+                    stats["bytes"] += result["size"]
+                if report:
+                    report(rel, result)
+
+        with open(self.manifest_path, "a+", encoding="utf-8") as self.log, \
+                ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # Ends a line left unfinished by a killed run, so the next record
+            # starts on a line of its own.
+            if self.log.tell() and not self.log_ends_with_newline():
+                self.log.write("\n")
+            # Files go to the pool in batches, at most two per thread in
+            # flight, so the scan never runs far ahead of the copies.
+            pending = deque()
+            for batch in batches(todo(), BATCH_SIZE):
+                pending.append(pool.submit(self.recover_batch, batch))
+                if len(pending) >= 2 * self.workers:
+                    finish(pending.popleft())
+            while pending:
+                finish(pending.popleft())
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+def recover(source, dest, workers=None, verify=True, recheck=False, report=None):
+    return RecoveryEngine(source, dest, workers, verify=verify, recheck=recheck).run(report)
+
+# --- Synthetic evidence folder for benchmarking ---
+def generate_tree(path, count, seed=1):
+    # count .deleted files of 256 B - 16 KiB spread over nested folders, with
+    # every name used about three times so collisions are common.
+    rng = random.Random(seed)
+    names = [f"file{n}.{('txt', 'jpg', 'doc', 'pdf')[n % 4]}" for n in range(max(1, count // 3))]
+    data = rng.randbytes(1 << 14)
+    for n in range(count):
+        folder = os.path.join(path, f"user{n % 10}", f"dir{n % 100}")
+        os.makedirs(folder, exist_ok=True)
+        size = rng.randint(256, len(data))
+        offset = rng.randrange(len(data) - size + 1)
+        with open(os.path.join(folder, f"{rng.choice(names)}{SUFFIX}"), "ab") as f:
+            f.write(data[offset:offset + size])
+
+def copy2_baseline(source, dest):
+    # What 4_recovery.py used to do: serial shutil.copy2 into one folder.
+    os.makedirs(dest, exist_ok=True)
+    count = 0
+    start = time.perf_counter()
+    for root, dirs, files in os.walk(source):
+        for file in files:
+            if file.endswith(SUFFIX):
+                shutil.copy2(os.path.join(root, file), os.path.join(dest, recovered_name(file)))
+                count += 1
+    return count, time.perf_counter() - start
+
+# --- Main ---
+if __name__ == "__main__":
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if "--generate" in flags:
+        generate_tree(args[1], int(args[0]))
+    elif "--baseline" in flags:
+        count, seconds = copy2_baseline(args[0], args[1])
+        print(f"shutil.copy2: {count} files in {seconds:.2f} s ({count / max(seconds, 1e-9):.0f} files/s)")
+    elif len(args) >= 2:
+        methods = [m for m in METHODS if f"--{m}" in flags]
+        engine = RecoveryEngine(args[0], args[1], int(args[2]) if len(args) > 2 else None,
+                                verify="--no-verify" not in flags, recheck="--recheck" in flags,
+                                methods=methods or METHODS)
+        failures = []
+        stats = engine.run(lambda rel, result: failures.append((rel, result)) if isinstance(result, OSError) else None)
+        for rel, error in failures[:20]:
+            print(f"FAILED {rel}: {error}", file=sys.stderr)
+        rate = stats["recovered"] / max(stats["seconds"], 1e-9)
+        print(f"{stats['recovered']} recovered ({stats['bytes'] / 1e6:.1f} MB), {stats['skipped']} already done, "
+              f"{stats['failed']} failed in {stats['seconds']:.2f} s ({rate:.0f} files/s, {engine.workers} threads)")
+    else:
+        print("usage: recovery_engine.py SOURCE DEST [THREADS] [--no-verify] [--recheck] [--copy_file_range|--sendfile|--read]")
+        print("       recovery_engine.py --generate COUNT DIR")
+        print("       recovery_engine.py --baseline SOURCE DEST")
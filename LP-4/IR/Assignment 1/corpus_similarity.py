@@ -0,0 +1,142 @@
+import sys
+
+import numpy as np
+from scipy import sparse
+
+from one_similiarity import corpus_frequencies
+from parallel_ingest import ingest
+
+
+# Corpus mode: every document is tokenized once, all documents share one
+# vocabulary and the term-frequency vectors live in a single CSR matrix, so
+# the cosine of every pair comes out of one sparse matrix product instead of
+# a dotProduct/vector_angle call per pair.
+
+
+def build_vocabulary(freq_maps):
+
+	vocabulary = {}
+
+	for D in freq_maps:
+		for word in D:
+			if word not in vocabulary:
+				vocabulary[word] = len(vocabulary)
+
+	return vocabulary
+
+
+def term_frequency_matrix(freq_maps, vocabulary=None):
+
+	if vocabulary is None:
+		vocabulary = build_vocabulary(freq_maps)
+
+	indptr = [0]
+	indices = []
+	data = []
+
+	for D in freq_maps:
+		for word, count in D.items():
+			column = vocabulary.get(word)
+			if column is not None:
+				indices.append(column)
+				data.append(count)
+		indptr.append(len(indices))
+
+	matrix = sparse.csr_matrix(
+		(np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+		shape=(len(freq_maps), len(vocabulary)))
+
+	return matrix, vocabulary
+
+
+def matrix_from_tables(vocabulary, tables):
+
+	indptr = np.zeros(len(tables) + 1, dtype=np.int64)
+	indptr[1:] = np.cumsum([len(term_ids) for term_ids, _ in tables])
+
+	indices = np.empty(indptr[-1], dtype=np.int64)
+	data = np.empty(indptr[-1], dtype=np.float64)
+	for row, (term_ids, counts) in enumerate(tables):
+		indices[indptr[row]:indptr[row + 1]] = np.frombuffer(term_ids, dtype=np.uint32)
+		data[indptr[row]:indptr[row + 1]] = np.frombuffer(counts, dtype=np.uint32)
+
+	return sparse.csr_matrix((data, indices, indptr), shape=(len(tables), len(vocabulary)))
+
+
+def normalize_rows(matrix):
+
+	norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+	# Empty documents keep a zero row instead of dividing by zero.
+	norms[norms == 0] = 1.0
+
+	return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+
+def cosine_blocks(matrix, block_size=1024):
+
+	unit = normalize_rows(matrix)
+	unit_t = unit.T.tocsc()
+
+	for start in range(0, unit.shape[0], block_size):
+		stop = min(start + block_size, unit.shape[0])
+		yield start, stop, unit[start:stop].dot(unit_t).toarray()
+
+
+def angle_blocks(matrix, block_size=1024):
+
+	for start, stop, cosines in cosine_blocks(matrix, block_size):
+		# Rounding can push a self-similarity just above 1.0.
+		np.clip(cosines, -1.0, 1.0, out=cosines)
+		yield start, stop, np.arccos(cosines, out=cosines)
+
+
+def cosine_matrix(matrix):
+
+	unit = normalize_rows(matrix)
+
+	return unit.dot(unit.T).toarray()
+
+
+def angle_matrix(matrix):
+
+	cosines = cosine_matrix(matrix)
+	np.clip(cosines, -1.0, 1.0, out=cosines)
+
+	return np.arccos(cosines, out=cosines)
+
+
+def corpus_matrix(filenames, stream=False, cache=None, workers=None):
+
+	if workers is not None and cache is None:
+		vocabulary, tables = ingest(filenames, workers, stream)
+		matrix = matrix_from_tables(vocabulary, tables)
+	else:
+		matrix, vocabulary = term_frequency_matrix(corpus_frequencies(filenames, stream, cache))
+
+	print(len(filenames), "documents, ", )
+	print(len(vocabulary), "distinct words, ", )
+	print(matrix.nnz, "non-zero term frequencies")
+
+	return matrix
+
+
+def corpusSimilarity(filenames, stream=False, cache=None, workers=None):
+
+	return angle_matrix(corpus_matrix(filenames, stream, cache, workers))
+
+
+def corpusSimilarityBlocks(filenames, block_size=1024, stream=False, cache=None, workers=None):
+
+	# Never holds the full n x n result: yields (start, stop, angles of rows
+	# start..stop) one block at a time, to be reduced or written out (e.g.
+	# into an np.memmap) as it goes.
+	return angle_blocks(corpus_matrix(filenames, stream, cache, workers), block_size)
+
+
+if __name__ == "__main__":
+	filenames = sys.argv[1:] or ['sample1.txt', 'sample2.txt']
+	angles = corpusSimilarity(filenames)
+
+	for i in range(len(filenames)):
+		for j in range(i + 1, len(filenames)):
+			print("The distance between", filenames[i], "and", filenames[j], "is: % 0.6f (radians)" % angles[i, j])
@@ -0,0 +1,77 @@
+import heapq
+import math
+import sys
+from array import array
+
+from one_similiarity import get_words_from_line_list, count_frequency, corpus_frequencies
+
+
+# Inverted index over count_frequency output: term -> postings of (doc id,
+# tf-idf weight), with every document's vector norm computed once at build
+# time. A query only walks the postings of its own terms, so its cost
+# depends on how many documents share those terms, not on the corpus size.
+
+
+class InvertedIndex:
+
+	def __init__(self, names, freq_maps):
+
+		self.names = list(names)
+		self.postings = {}
+		self.idf = {}
+
+		document_frequency = {}
+		for D in freq_maps:
+			for word in D:
+				document_frequency[word] = document_frequency.get(word, 0) + 1
+
+		n = len(self.names)
+		for word, df in document_frequency.items():
+			self.idf[word] = math.log(n / df) + 1.0
+			self.postings[word] = (array('I'), array('d'))
+
+		squared_norms = [0.0] * n
+		for doc_id, D in enumerate(freq_maps):
+			for word, count in D.items():
+				weight = count * self.idf[word]
+				doc_ids, weights = self.postings[word]
+				doc_ids.append(doc_id)
+				weights.append(weight)
+				squared_norms[doc_id] += weight * weight
+
+		self.norms = array('d', (math.sqrt(s) or 1.0 for s in squared_norms))
+
+	@classmethod
+	def from_files(cls, filenames, stream=False, cache=None):
+		return cls(filenames, corpus_frequencies(filenames, stream, cache))
+
+	def query(self, text, k=10):
+
+		query_weights = {}
+		for word, count in count_frequency(get_words_from_line_list(text)).items():
+			if word in self.idf:
+				query_weights[word] = count * self.idf[word]
+
+		if not query_weights:
+			return []
+
+		query_norm = math.sqrt(sum(w * w for w in query_weights.values()))
+
+		scores = {}
+		for word, query_weight in query_weights.items():
+			doc_ids, weights = self.postings[word]
+			for doc_id, weight in zip(doc_ids, weights):
+				scores[doc_id] = scores.get(doc_id, 0.0) + query_weight * weight
+
+		norms = self.norms
+		top = heapq.nlargest(k, scores.items(), key=lambda item: item[1] / norms[item[0]])
+
+		return [(self.names[doc_id], score / (norms[doc_id] * query_norm)) for doc_id, score in top]
+
+
+if __name__ == "__main__":
+	index = InvertedIndex.from_files(sys.argv[2:] or ['sample1.txt', 'sample2.txt'])
+	text = sys.argv[1] if len(sys.argv) > 1 else "Taj Mahal"
+
+	for name, score in index.query(text):
+		print(name, ": % 0.6f" % score)
@@ -0,0 +1,183 @@
+import random
+import sys
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from one_similiarity import read_file, get_words_from_line_list, count_frequency, vector_angle
+
+
+# Near-duplicate mode: each document becomes a MinHash signature of its word
+# shingles, signatures are split into bands and hashed into LSH buckets, and
+# only documents sharing a bucket are compared with vector_angle. Finding
+# candidates is linear in the number of documents instead of quadratic.
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+MAX_ANGLE = 0.3
+
+MASK32 = np.uint64(0xFFFFFFFF)
+SHIFT32 = np.uint64(32)
+
+
+def shingle_hashes(word_list, k=SHINGLE_SIZE):
+
+	if not word_list:
+		return np.empty(0, dtype=np.uint64)
+
+	ids = np.fromiter((zlib.crc32(w.encode('utf-8')) for w in word_list), dtype=np.uint64, count=len(word_list))
+	k = min(k, len(ids))
+
+	# Polynomial hash of every window of k word ids; uint64 arithmetic wraps.
+	h = np.zeros(len(ids) - k + 1, dtype=np.uint64)
+	with np.errstate(over='ignore'):
+		for j in range(k):
+			h = h * np.uint64(1000003) + ids[j:len(ids) - k + 1 + j]
+
+	return np.unique((h ^ (h >> SHIFT32)) & MASK32)
+
+
+def permutations(num_perm=NUM_PERM, seed=1):
+
+	rng = np.random.default_rng(seed)
+	a = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+	b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+	return a, b
+
+
+def minhash(shingles, perms, chunk_size=4096):
+
+	a, b = perms
+	signature = np.full(len(a), np.iinfo(np.uint32).max, dtype=np.uint64)
+
+	with np.errstate(over='ignore'):
+		for start in range(0, len(shingles), chunk_size):
+			x = shingles[start:start + chunk_size]
+			# Multiply-shift hashing: one row per permutation, one column per shingle.
+			hashed = (a[:, None] * x[None, :] + b[:, None]) >> SHIFT32
+			np.minimum(signature, hashed.min(axis=1), out=signature)
+
+	return signature.astype(np.uint32)
+
+
+def lsh_candidates(signatures, bands=BANDS):
+
+	rows = signatures.shape[1] // bands
+	candidates = set()
+
+	for band in range(bands):
+		buckets = defaultdict(list)
+		block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+		for doc_id, key in enumerate(block):
+			buckets[key.tobytes()].append(doc_id)
+
+		for members in buckets.values():
+			for i in range(len(members)):
+				for j in range(i + 1, len(members)):
+					candidates.add((members[i], members[j]))
+
+	return candidates
+
+
+def word_lists_for_files(filenames):
+	return [get_words_from_line_list(read_file(filename)) for filename in filenames]
+
+
+def find_near_duplicates(word_lists, max_angle=MAX_ANGLE, num_perm=NUM_PERM, bands=BANDS, k=SHINGLE_SIZE):
+
+	perms = permutations(num_perm)
+	signatures = np.empty((len(word_lists), num_perm), dtype=np.uint32)
+	freq_maps = []
+	empty = set()
+
+	for doc_id, word_list in enumerate(word_lists):
+		signatures[doc_id] = minhash(shingle_hashes(word_list, k), perms)
+		freq_maps.append(count_frequency(word_list))
+		if not word_list:
+			empty.add(doc_id)
+
+	duplicates = []
+	for i, j in sorted(lsh_candidates(signatures, bands)):
+		if i in empty or j in empty:
+			continue
+		angle = vector_angle(freq_maps[i], freq_maps[j])
+		if angle <= max_angle:
+			duplicates.append((i, j, angle))
+
+	return duplicates
+
+
+def brute_force_near_duplicates(word_lists, max_angle=MAX_ANGLE):
+
+	freq_maps = [count_frequency(word_list) for word_list in word_lists]
+	duplicates = []
+
+	for i in range(len(freq_maps)):
+		if not freq_maps[i]:
+			continue
+		for j in range(i + 1, len(freq_maps)):
+			if not freq_maps[j]:
+				continue
+			angle = vector_angle(freq_maps[i], freq_maps[j])
+			if angle <= max_angle:
+				duplicates.append((i, j, angle))
+
+	return duplicates
+
+
+def nearDuplicates(filenames, max_angle=MAX_ANGLE):
+
+	for i, j, angle in find_near_duplicates(word_lists_for_files(filenames), max_angle):
+		print(filenames[i], "~", filenames[j], ": % 0.6f (radians)" % angle)
+
+
+# --- Benchmark: LSH against the brute-force pairwise path ---
+
+def synthetic_corpus(n_docs, doc_len=300, vocabulary_size=20000, dup_fraction=0.2, edit_rate=0.02, seed=7):
+
+	rng = random.Random(seed)
+	vocabulary = ["w%d" % i for i in range(vocabulary_size)]
+	docs = []
+
+	while len(docs) < n_docs:
+		if docs and rng.random() < dup_fraction:
+			# Copy an earlier document and replace a few of its words.
+			doc = list(rng.choice(docs))
+			for _ in range(int(len(doc) * edit_rate)):
+				doc[rng.randrange(len(doc))] = rng.choice(vocabulary)
+		else:
+			doc = [rng.choice(vocabulary) for _ in range(doc_len)]
+		docs.append(doc)
+
+	return docs
+
+
+def benchmark(n_docs=1000, max_angle=MAX_ANGLE):
+
+	docs = synthetic_corpus(n_docs)
+
+	start = time.perf_counter()
+	expected = {(i, j) for i, j, _ in brute_force_near_duplicates(docs, max_angle)}
+	brute_time = time.perf_counter() - start
+
+	start = time.perf_counter()
+	found = {(i, j) for i, j, _ in find_near_duplicates(docs, max_angle)}
+	lsh_time = time.perf_counter() - start
+
+	recall = len(found & expected) / len(expected) if expected else 1.0
+
+	print(n_docs, "documents, ", len(expected), "near-duplicate pairs")
+	print("brute force : %0.3f s" % brute_time)
+	print("minhash/lsh : %0.3f s" % lsh_time)
+	print("recall      : %0.4f" % recall)
+
+
+if __name__ == "__main__":
+	if sys.argv[1:2] == ["--benchmark"]:
+		benchmark(*(int(arg) for arg in sys.argv[2:3]))
+	else:
+		nearDuplicates(sys.argv[1:] or ['sample1.txt', 'sample2.txt'])
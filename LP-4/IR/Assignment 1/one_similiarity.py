@@ -1,6 +1,7 @@
 import math
 import string
 import sys
+from collections import Counter
 
 
 def read_file(filename):
@@ -42,8 +43,64 @@ def count_frequency(word_list):
 	return D
 
 
-def word_frequencies_for_file(filename):
+# Streaming path: the file is read in fixed-size chunks and counted as it
+# goes, so memory stays bounded by chunk_size plus the vocabulary instead of
+# holding the text, its translation and the full word list at once.
+CHUNK_SIZE = 1 << 20
+
+
+def read_file_chunks(filename, chunk_size=CHUNK_SIZE):
+	
+	try:
+		with open(filename, 'r') as f:
+			while True:
+				chunk = f.read(chunk_size)
+				if not chunk:
+					break
+				yield chunk
+	
+	except IOError:
+		print("Error opening or reading input file: ", filename)
+		sys.exit()
+
+
+def stream_word_frequencies(filename, chunk_size=CHUNK_SIZE):
+	
+	D = Counter()
+	carry = ""
+	characters = 0
+	
+	for chunk in read_file_chunks(filename, chunk_size):
+		characters += len(chunk)
+		text = carry + chunk.translate(translation_table)
+		words = text.split()
+		
+		# A word touching the end of the chunk may continue in the next one.
+		if words and not text[-1].isspace():
+			carry = words.pop()
+		else:
+			carry = ""
+		
+		D.update(words)
+	
+	if carry:
+		D[carry] += 1
+	
+	return D, characters
+
+
+def word_frequencies_for_file(filename, stream=False):
 	
+	if stream:
+		freq_mapping, characters = stream_word_frequencies(filename)
+
+		print("File", filename, ":", )
+		print(characters, "lines, ", )
+		print(sum(freq_mapping.values()), "words, ", )
+		print(len(freq_mapping), "distinct words")
+
+		return freq_mapping
+
 	line_list = read_file(filename)
 	word_list = get_words_from_line_list(line_list)
 	freq_mapping = count_frequency(word_list)
@@ -57,6 +114,23 @@ def word_frequencies_for_file(filename):
 
 
 
+def corpus_frequencies(filenames, stream=False, cache=None):
+
+	freq_maps = []
+
+	for filename in filenames:
+		if cache is not None:
+			freq_maps.append(cache.frequencies(filename, stream))
+		elif stream:
+			freq_maps.append(stream_word_frequencies(filename)[0])
+		else:
+			word_list = get_words_from_line_list(read_file(filename))
+			freq_maps.append(count_frequency(word_list))
+
+	return freq_maps
+
+
+
 def dotProduct(D1, D2):
 	Sum = 0.0
 	
@@ -75,17 +149,22 @@ def vector_angle(D1, D2):
 	return math.acos(numerator / denominator)
 
 
-def documentSimilarity(filename_1, filename_2):
+def documentSimilarity(filename_1, filename_2, stream=False, cache=None):
 	
 
-	sorted_word_list_1 = word_frequencies_for_file(filename_1)
-	sorted_word_list_2 = word_frequencies_for_file(filename_2)
+	if cache is not None:
+		sorted_word_list_1 = cache.frequencies(filename_1, stream)
+		sorted_word_list_2 = cache.frequencies(filename_2, stream)
+	else:
+		sorted_word_list_1 = word_frequencies_for_file(filename_1, stream)
+		sorted_word_list_2 = word_frequencies_for_file(filename_2, stream)
 	distance = vector_angle(sorted_word_list_1, sorted_word_list_2)
 	
 	print("The distance between the documents is: % 0.6f (radians)"% distance)
 	
 
-documentSimilarity('sample1.txt', 'sample2.txt')
+if __name__ == "__main__":
+	documentSimilarity('sample1.txt', 'sample2.txt')
 
 
 #OUTPUT
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from one_similiarity import read_file, get_words_from_line_list, count_frequency, stream_word_frequencies
+from tf_cache import pack_words, unpack_words
+
+
+# Parallel ingestion: files are tokenized and counted in worker processes.
+# A worker sends back its frequency table as two flat buffers (words packed
+# by tf_cache.pack_words, packed uint32 counts) instead of a pickled dict,
+# and the parent merges them into one shared vocabulary, keeping each file
+# as a pair of (term id, count) arrays.
+
+
+def encode_table(D):
+	return pack_words(D), array('I', D.values()).tobytes()
+
+
+def count_file(task):
+
+	filename, stream = task
+
+	if stream:
+		D = stream_word_frequencies(filename)[0]
+	else:
+		D = count_frequency(get_words_from_line_list(read_file(filename)))
+
+	return encode_table(D)
+
+
+def merge_table(vocabulary, words, counts):
+
+	term_ids = array('I')
+	values = array('I')
+	values.frombytes(counts)
+
+	for word in unpack_words(words, len(values)):
+		term_id = vocabulary.get(word)
+		if term_id is None:
+			term_id = vocabulary[word] = len(vocabulary)
+		term_ids.append(term_id)
+
+	return term_ids, values
+
+
+def ingest(filenames, workers=None, stream=False, chunksize=None):
+
+	workers = workers or os.cpu_count() or 1
+	if chunksize is None:
+		# A few batches per worker keeps the pool busy without huge IPC messages.
+		chunksize = max(1, len(filenames) // (workers * 4))
+
+	vocabulary = {}
+	tables = []
+	tasks = [(filename, stream) for filename in filenames]
+
+	if workers == 1:
+		for words, counts in map(count_file, tasks):
+			tables.append(merge_table(vocabulary, words, counts))
+		return vocabulary, tables
+
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		for words, counts in pool.map(count_file, tasks, chunksize=chunksize):
+			tables.append(merge_table(vocabulary, words, counts))
+
+	return vocabulary, tables
+
+
+def table_to_frequencies(vocabulary, table):
+
+	words = list(vocabulary)
+	term_ids, counts = table
+
+	return {words[term_id]: count for term_id, count in zip(term_ids, counts)}
+
+
+if __name__ == "__main__":
+	filenames = sys.argv[1:] or ['sample1.txt', 'sample2.txt']
+
+	start = time.perf_counter()
+	vocabulary, tables = ingest(filenames)
+	elapsed = time.perf_counter() - start
+
+	print(len(filenames), "files, ", )
+	print(len(vocabulary), "distinct words, ", )
+	print(sum(len(t[0]) for t in tables), "term frequencies")
+	print("ingested in %0.3f s" % elapsed)
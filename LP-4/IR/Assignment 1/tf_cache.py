@@ -0,0 +1,186 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from array import array
+
+from one_similiarity import read_file, get_words_from_line_list, count_frequency, stream_word_frequencies
+
+
+# On-disk cache of frequency maps. An entry is keyed by the file's absolute
+# path and remembers its size, mtime and content hash:
+#   - size and mtime unchanged  -> served without touching the file
+#   - stat changed, same hash   -> served after one hashing pass
+#   - content changed           -> recomputed and replaced
+# Frequency maps are stored as zlib(packed words) + packed uint32 counts,
+# where pack_words writes each word's length ahead of the text so a token
+# may contain any character, NUL included. Least recently used entries are evicted to keep the blobs within
+# max_bytes; a single map larger than that is not cached at all.
+
+CACHE_FILE = ".tf_cache.sqlite"
+MAX_BYTES = 64 << 20
+# Version 1: words packed by pack_words (version 0 joined them with NUL).
+SCHEMA_VERSION = 1
+
+
+def content_hash(filename, chunk_size=1 << 20):
+
+	h = hashlib.blake2b(digest_size=16)
+
+	with open(filename, 'rb') as f:
+		while True:
+			chunk = f.read(chunk_size)
+			if not chunk:
+				break
+			h.update(chunk)
+
+	return h.digest()
+
+
+def pack_words(words):
+
+	# uint32 character length of every word, then the words back to back.
+	words = list(words)
+	lengths = array('I', map(len, words))
+
+	return lengths.tobytes() + "".join(words).encode('utf-8')
+
+
+def unpack_words(data, count):
+
+	lengths = array('I')
+	lengths.frombytes(data[:count * lengths.itemsize])
+	text = data[count * lengths.itemsize:].decode('utf-8')
+
+	words = []
+	offset = 0
+	for length in lengths:
+		words.append(text[offset:offset + length])
+		offset += length
+
+	return words
+
+
+def encode_frequencies(D):
+
+	counts = array('I', D.values())
+
+	return zlib.compress(pack_words(D)), counts.tobytes()
+
+
+def decode_frequencies(words, counts):
+
+	values = array('I')
+	values.frombytes(counts)
+
+	return dict(zip(unpack_words(zlib.decompress(words), len(values)), values))
+
+
+class TermFrequencyCache:
+
+	def __init__(self, cache_file=CACHE_FILE, max_bytes=MAX_BYTES):
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self.db = sqlite3.connect(cache_file)
+		self.db.execute(
+			"CREATE TABLE IF NOT EXISTS tf ("
+			" path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, digest BLOB,"
+			" words BLOB, counts BLOB, nbytes INTEGER, used REAL)")
+		self.db.execute("CREATE INDEX IF NOT EXISTS tf_used ON tf (used)")
+		if self.db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+			# Older entries use another word encoding; recompute them.
+			self.db.execute("DELETE FROM tf")
+			self.db.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+			self.db.commit()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def close(self):
+		self.db.commit()
+		self.db.close()
+
+	def frequencies(self, filename, stream=False):
+
+		path = os.path.abspath(filename)
+		try:
+			st = os.stat(path)
+		except OSError:
+			# Let the normal reader report the missing file.
+			return self.compute(filename, stream)
+
+		row = self.db.execute(
+			"SELECT size, mtime, digest, words, counts FROM tf WHERE path = ?", (path,)).fetchone()
+
+		if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+			self.touch(path)
+			self.hits += 1
+			return decode_frequencies(row[3], row[4])
+
+		digest = content_hash(path)
+
+		if row is not None and row[2] == digest:
+			# Touched but not modified: refresh the stat key only.
+			self.db.execute(
+				"UPDATE tf SET size = ?, mtime = ?, used = ? WHERE path = ?",
+				(st.st_size, st.st_mtime_ns, time.time(), path))
+			self.hits += 1
+			return decode_frequencies(row[3], row[4])
+
+		self.misses += 1
+		D = self.compute(filename, stream)
+		self.put(path, st, digest, D)
+
+		return D
+
+	def compute(self, filename, stream):
+
+		if stream:
+			return stream_word_frequencies(filename)[0]
+
+		return count_frequency(get_words_from_line_list(read_file(filename)))
+
+	def touch(self, path):
+		self.db.execute("UPDATE tf SET used = ? WHERE path = ?", (time.time(), path))
+
+	def put(self, path, st, digest, D):
+
+		words, counts = encode_frequencies(D)
+		nbytes = len(words) + len(counts)
+
+		if nbytes > self.max_bytes:
+			# Would evict everything and still not fit: serve it uncached and
+			# drop any stale entry for the same path.
+			print("tf_cache: %s needs %d bytes, over the %d byte budget; not cached" % (path, nbytes, self.max_bytes), file=sys.stderr)
+			self.db.execute("DELETE FROM tf WHERE path = ?", (path,))
+			self.db.commit()
+			return
+
+		# Make room first, so the entry being written is never the one evicted.
+		self.evict(self.max_bytes - nbytes, path)
+		self.db.execute(
+			"INSERT OR REPLACE INTO tf VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+			(path, st.st_size, st.st_mtime_ns, digest, words, counts, nbytes, time.time()))
+		self.db.commit()
+
+	def evict(self, budget, replacing=None):
+
+		# The entry about to be replaced does not count against the budget.
+		total = self.db.execute(
+			"SELECT COALESCE(SUM(nbytes), 0) FROM tf WHERE path IS NOT ?", (replacing,)).fetchone()[0]
+		if total <= budget:
+			return
+
+		rows = self.db.execute(
+			"SELECT path, nbytes FROM tf WHERE path IS NOT ? ORDER BY used", (replacing,)).fetchall()
+		for path, nbytes in rows:
+			self.db.execute("DELETE FROM tf WHERE path = ?", (path,))
+			total -= nbytes
+			if total <= budget:
+				break
@@ -0,0 +1,66 @@
+import sys
+
+import numpy as np
+from scipy import sparse
+
+
+# Sparse PageRank by power iteration. The graph is given as integer edge
+# arrays (source, target); the transition matrix is built once in CSR form
+# so each iteration is one sparse matrix-vector product. Pages without
+# outgoing links (dangling nodes) spread their rank evenly over all pages.
+
+DAMPING_FACTOR = 0.85
+
+
+def transition_matrix(src, dst, n):
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    out_degree = np.bincount(src, minlength=n)
+    weights = 1.0 / out_degree[src]
+    matrix = sparse.csr_matrix((weights, (dst, src)), shape=(n, n))
+    return matrix, out_degree == 0
+
+
+def pagerank(src, dst, n, damping=DAMPING_FACTOR, tol=1e-10, max_iter=100):
+    # Returns (rank vector summing to 1, iterations used). Stops once the
+    # L1 change between two iterations drops below tol.
+    matrix, dangling = transition_matrix(src, dst, n)
+    rank = np.full(n, 1.0 / n)
+
+    for iteration in range(1, max_iter + 1):
+        dangling_rank = rank[dangling].sum()
+        new_rank = damping * (matrix.dot(rank) + dangling_rank / n) + (1.0 - damping) / n
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tol:
+            break
+
+    return rank, iteration
+
+
+def load_graph(path):
+    # Edge file written by LinkGraph.save() in "Assignment 4/link_graph.py".
+    data = np.load(path)
+    urls = data['urls'].tobytes().decode('utf-8').split("\n") if data['urls'].size else []
+    return data['src'], data['dst'], urls
+
+
+def main():
+    if len(sys.argv) > 1:
+        src, dst, urls = load_graph(sys.argv[1])
+        top = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    else:
+        # A small four-page example.
+        src = [0, 0, 1, 2, 3]
+        dst = [1, 2, 2, 0, 2]
+        urls = ["Page %d" % k for k in range(1, 5)]
+        top = 4
+
+    rank, iterations = pagerank(src, dst, len(urls))
+    print("%d pages, %d links, converged after %d iterations" % (len(urls), len(src), iterations))
+    for k in np.argsort(-rank)[:top]:
+        print(" Page Rank of %s is :\t%.6f" % (urls[k], rank[k]))
+
+
+if __name__ == "__main__":
+    main()
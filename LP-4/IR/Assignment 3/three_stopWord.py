@@ -1,19 +1,93 @@
 import io
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from english_stopwords import STOP_WORDS
 
 
-stop_words = set(stopwords.words('english'))
-file1 = open("text.txt")
+BUFFER_SIZE = 1 << 20
 
 
-line = file1.read()
-words = line.split()
-for r in words:
-	if not r in stop_words:
-		appendFile = open('filteredtext.txt','a')
-		appendFile.write(" "+r)
-		appendFile.close()
+# Reads the input line by line and writes every surviving word through one
+# buffered writer, instead of reopening the output file once per word.
+def filter_stream(src, dst, stop_words):
+	for line in src:
+		kept = [r for r in line.split() if r not in stop_words]
+		if kept:
+			dst.write(" " + " ".join(kept))
+
+
+def filter_file(in_path, out_path, stop_words, mode='a'):
+	with open(in_path, buffering=BUFFER_SIZE) as src, open(out_path, mode, buffering=BUFFER_SIZE) as dst:
+		filter_stream(src, dst, stop_words)
+
+
+# Writes to a temporary file next to out_path and renames it into place, so
+# readers never see a half-written output.
+def filter_file_atomic(in_path, out_path, stop_words):
+	out_dir = os.path.dirname(os.path.abspath(out_path))
+	fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix="." + os.path.basename(out_path), suffix=".tmp")
+	try:
+		with open(in_path, buffering=BUFFER_SIZE) as src, os.fdopen(fd, 'w', buffering=BUFFER_SIZE) as dst:
+			filter_stream(src, dst, stop_words)
+		# mkstemp creates the file private to the owner.
+		os.chmod(tmp_path, 0o644)
+		os.replace(tmp_path, out_path)
+	except BaseException:
+		os.unlink(tmp_path)
+		raise
+
+
+worker_stop_words = None
+
+
+def init_worker(stop_words):
+	global worker_stop_words
+	worker_stop_words = stop_words
+
+
+def filter_task(task):
+	in_path, out_path = task
+	filter_file_atomic(in_path, out_path, worker_stop_words)
+	return out_path
+
+
+# Each output keeps its input's path relative to the folder the inputs have
+# in common, so inputs from one folder keep their plain file names, and
+# same-named files from different folders do not overwrite each other.
+def output_paths(in_paths, out_dir):
+	in_paths = [os.path.abspath(in_path) for in_path in in_paths]
+	if not in_paths:
+		return []
+	base = os.path.commonpath([os.path.dirname(in_path) for in_path in in_paths])
+	out_paths = [os.path.join(out_dir, os.path.relpath(in_path, base)) for in_path in in_paths]
+	seen = set()
+	for in_path, out_path in zip(in_paths, out_paths):
+		if out_path in seen:
+			raise ValueError("input listed more than once: %s" % in_path)
+		seen.add(out_path)
+	return out_paths
+
+
+# Filters many documents in parallel into out_dir (see output_paths). The
+# stop-word set is sent once per worker.
+def filter_batch(in_paths, out_dir, stop_words, workers=None):
+	out_paths = output_paths(in_paths, out_dir)
+	for folder in {os.path.dirname(out_path) for out_path in out_paths} | {out_dir}:
+		os.makedirs(folder, exist_ok=True)
+	tasks = list(zip(in_paths, out_paths))
+	with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(frozenset(stop_words),)) as pool:
+		return list(pool.map(filter_task, tasks))
+
+
+if __name__ == "__main__":
+	stop_words = STOP_WORDS
+	if sys.argv[1:2] == ["--batch"]:
+		for out_path in filter_batch(sys.argv[3:], sys.argv[2], stop_words):
+			print(out_path)
+	else:
+		filter_file("text.txt", "filteredtext.txt", stop_words)
 
 
 #INPUT
@@ -0,0 +1,191 @@
+import asyncio
+import random
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from page_cache import MISSING
+
+
+# Asynchronous crawl engine: one pooled keep-alive aiohttp session, a
+# bounded number of in-flight requests per host, a minimum delay between
+# requests to the same host, retries with exponential backoff, and a queue
+# that hands fetched pages to the parser while other fetches are running.
+
+# `unchanged` is set when a cached page was confirmed current, either by a
+# 304 or by a 200 whose body matches the cached copy.
+Page = namedtuple('Page', ['url', 'status', 'body', 'headers', 'unchanged'], defaults=(False,))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class StatusError(Exception):
+    # A page that came back with a status other than 200 or 304, after any
+    # retries; recorded in Crawler.errors.
+
+    def __init__(self, url, status):
+        super().__init__("HTTP %d for %s" % (status, url))
+        self.url = url
+        self.status = status
+
+
+class Crawler:
+
+    def __init__(self, headers=None, workers=16, per_host=4, delay=0.25, retries=3, backoff=0.5, timeout=30, cache=None):
+        self.headers = headers or {}
+        self.workers = workers
+        self.per_host = per_host
+        self.delay = delay
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.session = None
+        self.slots = {}
+        self.locks = {}
+        self.next_request = {}
+        self.errors = []
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.workers, limit_per_host=self.per_host, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def host_slot(self, host):
+        if host not in self.slots:
+            self.slots[host] = asyncio.Semaphore(self.per_host)
+            self.locks[host] = asyncio.Lock()
+            self.next_request[host] = 0.0
+        return self.slots[host]
+
+    async def polite_wait(self, host):
+        # Requests to one host start at least `delay` seconds apart.
+        async with self.locks[host]:
+            now = asyncio.get_running_loop().time()
+            start = max(now, self.next_request[host])
+            self.next_request[host] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def get(self, url, headers=None):
+        async with self.session.get(url, headers=headers) as response:
+            body = await response.read()
+            return Page(str(response.url), response.status, body, response.headers)
+
+    async def fetch(self, url, headers=None):
+        if self.cache is None:
+            return await self.fetch_remote(url, headers)
+
+        page = await self.fetch_remote(url, dict(headers or {}, **self.cache.validators(url)))
+        if page.status == 304:
+            return Page(url, page.status, self.cache.body(url), page.headers, True)
+        if page.status == 200:
+            return page._replace(unchanged=not self.cache.store(url, page.headers, page.body))
+        return page
+
+    async def fetch_remote(self, url, headers=None):
+        host = urlsplit(url).netloc
+        slot = self.host_slot(host)
+
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                async with slot:
+                    await self.polite_wait(host)
+                    page = await self.get(url, headers)
+                if page.status not in RETRY_STATUSES or last:
+                    return page
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if last:
+                    raise
+            # Back off outside the host slot so other requests can proceed.
+            await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+
+    def parse_page(self, url, page, parse):
+        if self.cache is None:
+            return parse(page)
+        if page.unchanged:
+            result = self.cache.result(url, parse.__name__)
+            if result is not MISSING:
+                return result
+        result = parse(page)
+        if page.status == 200 or page.unchanged:
+            return self.cache.store_result(url, parse.__name__, result)
+        return result
+
+    async def fetch_parsed(self, url, parse):
+        return self.parse_page(url, await self.fetch(url), parse)
+
+    async def crawl(self, urls, parse, on_result=None):
+        # Returns parse(page) for every fetched url, in the order of `urls`;
+        # pages whose parse returns None and urls that fail are left out.
+        # on_result(url, result) is called as each page is parsed, None
+        # results included, so results can be streamed out; if it raises, the
+        # crawl stops and the exception propagates. Responses other than 200
+        # (or an unchanged cached page) are not parsed: they go to
+        # self.errors as StatusError and on_result is not called, so a
+        # resumed crawl tries them again.
+        url_queue = asyncio.Queue()
+        for index, url in enumerate(urls):
+            url_queue.put_nowait((index, url))
+
+        page_queue = asyncio.Queue(maxsize=self.workers * 2)
+        results = {}
+
+        async def fetcher():
+            while True:
+                try:
+                    index, url = url_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    page = await self.fetch(url)
+                except Exception as e:
+                    self.errors.append((url, e))
+                    continue
+                if page.status != 200 and not page.unchanged:
+                    self.errors.append((url, StatusError(url, page.status)))
+                    continue
+                await page_queue.put((index, url, page))
+
+        async def parser():
+            while True:
+                item = await page_queue.get()
+                if item is None:
+                    return
+                index, url, page = item
+                try:
+                    result = self.parse_page(url, page, parse)
+                except Exception as e:
+                    self.errors.append((page.url, e))
+                    continue
+                if on_result is not None:
+                    on_result(url, result)
+                if result is not None:
+                    results[index] = result
+
+        parser_task = asyncio.create_task(parser())
+        fetchers = asyncio.gather(*(fetcher() for _ in range(self.workers)))
+        try:
+            # The parser only stops before the fetchers when on_result raised
+            # (e.g. the output disk is full). Re-raise that right away rather
+            # than leave the fetchers blocked on the full page queue.
+            await asyncio.wait([parser_task, fetchers], return_when=asyncio.FIRST_COMPLETED)
+            if parser_task.done():
+                parser_task.result()
+            await fetchers
+            await page_queue.put(None)
+            await parser_task
+        finally:
+            fetchers.cancel()
+            parser_task.cancel()
+            await asyncio.gather(fetchers, parser_task, return_exceptions=True)
+
+        return [results[index] for index in sorted(results)]
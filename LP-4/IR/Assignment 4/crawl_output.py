@@ -0,0 +1,207 @@
+import csv
+import json
+import os
+
+
+# Streaming output stage for crawl results. Rows are appended to a CSV or
+# JSONL file in batches, and every finished URL (including pages that gave
+# no row) is recorded in a checkpoint file, so an interrupted crawl resumes
+# without redoing finished pages. A spreadsheet is exported once, at the end.
+
+FIELDS = ['Number', 'movie_url', 'movie_name', 'movie_introduction']
+
+XLS_MAX_ROWS = 65536
+
+
+class JsonlSink:
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def read(path):
+        # Drops a torn last line left by a crash mid-write.
+        rows = []
+        good = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                rows.append(json.loads(line))
+                good += len(line)
+        if good != os.path.getsize(path):
+            os.truncate(path, good)
+        return rows
+
+    def write_rows(self, rows):
+        self.f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+    def flush(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def close(self):
+        self.f.close()
+
+
+class CsvSink:
+
+    def __init__(self, path):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.f)
+        if new:
+            self.writer.writerow(FIELDS)
+
+    @staticmethod
+    def read(path):
+        # Drops a torn last record left by a crash mid-write, as
+        # JsonlSink.read does. Quoted fields may span lines, so the file is
+        # parsed record by record while counting the bytes consumed, and cut
+        # after the last record that ended with a newline.
+        rows = []
+        good = 0
+        consumed = [0, True]
+
+        with open(path, 'rb') as f:
+            def lines():
+                for line in f:
+                    consumed[0] += len(line)
+                    consumed[1] = line.endswith(b'\n')
+                    yield line.decode('utf-8', 'replace')
+
+            header = True
+            try:
+                # strict: a record cut inside a quoted field raises at EOF.
+                for record in csv.reader(lines(), strict=True):
+                    if not consumed[1]:
+                        break
+                    if not header:
+                        if len(record) != len(FIELDS) or not record[0].isdigit():
+                            break
+                        row = dict(zip(FIELDS, record))
+                        row['Number'] = int(row['Number'])
+                        rows.append(row)
+                    header = False
+                    good = consumed[0]
+            except csv.Error:
+                pass
+        if good != os.path.getsize(path):
+            os.truncate(path, good)
+        return rows
+
+    def write_rows(self, rows):
+        self.writer.writerows([row[field] for field in FIELDS] for row in rows)
+
+    def flush(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def close(self):
+        self.f.close()
+
+
+SINKS = {'.jsonl': JsonlSink, '.csv': CsvSink}
+
+
+def sink_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SINKS:
+        raise ValueError("unsupported output format: %s (use .csv or .jsonl)" % path)
+    return SINKS[ext]
+
+
+def read_rows(path):
+    if not os.path.exists(path):
+        return []
+    return sink_for(path).read(path)
+
+
+class OutputStage:
+
+    def __init__(self, path, checkpoint=None, batch_size=100):
+        self.path = path
+        self.checkpoint_path = checkpoint or path + '.done'
+        self.batch_size = batch_size
+        self.pending_rows = []
+        self.pending_urls = []
+
+        # URLs already written as rows count as done even if the crash
+        # happened before their checkpoint entry was flushed.
+        rows = read_rows(path)
+        self.count = len(rows)
+        self.done = {row['movie_url'] for row in rows}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                self.done.update(line.rstrip('\n') for line in f if line.endswith('\n'))
+
+        self.sink = sink_for(path)(path)
+        self.checkpoint = open(self.checkpoint_path, 'a', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def remaining(self, urls):
+        return [url for url in urls if url not in self.done]
+
+    def add(self, url, result):
+        if result is not None:
+            self.count += 1
+            self.pending_rows.append({
+                'Number': self.count,
+                'movie_url': url,
+                'movie_name': url.split('/')[-1],
+                'movie_introduction': result[1],
+            })
+        self.pending_urls.append(url)
+        self.done.add(url)
+        if len(self.pending_urls) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Rows reach disk before the checkpoint that marks them finished.
+        self.sink.write_rows(self.pending_rows)
+        self.sink.flush()
+        self.checkpoint.writelines(url + '\n' for url in self.pending_urls)
+        self.checkpoint.flush()
+        os.fsync(self.checkpoint.fileno())
+        self.pending_rows = []
+        self.pending_urls = []
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+        self.checkpoint.close()
+
+
+def export_workbook(rows_path, out_path):
+    rows = read_rows(rows_path)
+
+    if out_path.lower().endswith('.xlsx'):
+        from openpyxl import Workbook
+        workbook = Workbook(write_only = True)
+        table = workbook.create_sheet('data')
+        table.append(FIELDS)
+        for row in rows:
+            table.append([row[field] for field in FIELDS])
+        workbook.save(out_path)
+        return len(rows)
+
+    if len(rows) + 1 > XLS_MAX_ROWS:
+        raise ValueError("%d rows do not fit in .xls; export to .xlsx instead" % len(rows))
+
+    from xlwt import Workbook
+    workbook = Workbook(encoding = 'utf-8')
+    table = workbook.add_sheet('data')
+    for col, field in enumerate(FIELDS):
+        table.write(0, col, field)
+    for line, row in enumerate(rows, 1):
+        for col, field in enumerate(FIELDS):
+            table.write(line, col, row[field])
+    workbook.save(out_path)
+    return len(rows)
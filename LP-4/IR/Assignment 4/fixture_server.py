@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Local stand-in for the movie site: serves the pages under fixtures/ over
+# keep-alive HTTP/1.1 with ETag and Last-Modified validators, mapping
+# extension-less paths such as /m/fire_of_love to fire_of_love.html.
+# Point the crawler at http://127.0.0.1:<port>/.
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def translate_path(self, path):
+        local = super().translate_path(path)
+        if not os.path.exists(local) and os.path.exists(local + ".html"):
+            return local + ".html"
+        return local
+
+    # SimpleHTTPRequestHandler already answers If-Modified-Since; this adds
+    # an ETag built from the file's mtime and size and honours If-None-Match.
+    def send_head(self):
+        local = self.translate_path(self.path)
+        self.etag = None
+        if os.path.isfile(local):
+            st = os.stat(local)
+            self.etag = '"%x-%x"' % (st.st_mtime_ns, st.st_size)
+            if self.headers.get("If-None-Match") == self.etag:
+                self.send_response(304)
+                self.end_headers()
+                return None
+        return super().send_head()
+
+    def end_headers(self):
+        if getattr(self, "etag", None):
+            self.send_header("ETag", self.etag)
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(port=0, directory=FIXTURES):
+    # Starts the server on a background thread and returns it; the bound
+    # port is server.server_address[1]. Call server.shutdown() to stop it.
+    server = ThreadingHTTPServer(("127.0.0.1", port), partial(FixtureHandler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    server = serve_fixtures(port)
+    print("Serving", FIXTURES, "on http://127.0.0.1:%d/" % server.server_address[1])
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
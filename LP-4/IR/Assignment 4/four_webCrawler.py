@@ -1,46 +1,76 @@
-import requests
-import lxml
-from bs4 import BeautifulSoup
-from xlwt import *
-workbook = Workbook(encoding = 'utf-8')
-table = workbook.add_sheet('data')
-table.write(0, 0, 'Number')
-table.write(0, 1, 'movie_url')
-table.write(0, 2, 'movie_name')
-table.write(0, 3, 'movie_introduction')
-line = 1
+import asyncio
+import os
+import sys
+from crawl_engine import Crawler
+from extract import listing_links, page_links, synopsis
+from link_graph import LinkGraph
+from page_cache import PageCache
+from crawl_output import OutputStage, export_workbook
 url = "https://www.rottentomatoes.com/top/bestofrt/"
 headers = {
   'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/63.0.3239.132 Safari/537.36 QIHU 360SE'
 }
-f = requests.get(url, headers = headers)
-movies_lst = []
-soup = BeautifulSoup(f.content, 'lxml')
-movies = soup.find_all('a', {
-    'class': 'js-tile-link'
-  })
-num = 0
-for anchor in movies:
-    try:
-        urls = 'https://www.rottentomatoes.com' + anchor.get('href')
-        movies_lst.append(urls)
-        num += 1
-        movie_url = urls
-        movie_f = requests.get(movie_url, headers = headers)
-        movie_soup = BeautifulSoup(movie_f.content, 'lxml')
-        movie_content = movie_soup.find('div', {
-        'class': 'movie_synopsis clamp clamp-6 js-clamp'
-        })
+
+
+def parse_listing(page):
+    return listing_links(page.body, page.url)
+
+
+def parse_movie(page):
+    movie_content = synopsis(page.body)
+    if movie_content is None:
+        return None
+    return page.url, movie_content
+
+
+# Variants used when the link graph is recorded: they also return every
+# outgoing link, so pages served from the page cache still add their edges.
+def parse_listing_with_links(page):
+    return parse_listing(page), page_links(page.body, page.url)
+
+
+def parse_movie_with_links(page):
+    return parse_movie(page), page_links(page.body, page.url)
+
+
+# The listing page is fetched first; every movie page is then fetched
+# concurrently through the crawl engine and parsed as it arrives. With a
+# page cache, unchanged pages are neither downloaded nor parsed again; with
+# an output stage, rows are streamed to disk and pages finished by an
+# earlier, interrupted run are skipped. With a link graph, the outgoing
+# links of every fetched page are recorded as edges.
+async def crawl(url = url, cache = None, output = None, graph = None):
+    async with Crawler(headers, cache = cache) as crawler:
+        if graph is None:
+            movies_lst = await crawler.fetch_parsed(url, parse_listing)
+            remaining = output.remaining(movies_lst) if output is not None else movies_lst
+            on_result = output.add if output is not None else None
+            movies = await crawler.crawl(remaining, parse_movie, on_result)
+            return movies_lst, movies
+
+        movies_lst, links = await crawler.fetch_parsed(url, parse_listing_with_links)
+        graph.add_page(url, links)
+        remaining = output.remaining(movies_lst) if output is not None else movies_lst
+
+        def record(movie_url, result):
+            movie, links = result
+            graph.add_page(movie_url, links)
+            if output is not None:
+                output.add(movie_url, movie)
+
+        results = await crawler.crawl(remaining, parse_movie_with_links, record)
+    return movies_lst, [movie for movie, _ in results if movie is not None]
+
+
+if __name__ == "__main__":
+    graph = LinkGraph.load('link_graph.npz') if os.path.exists('link_graph.npz') else LinkGraph()
+    with PageCache() as cache, OutputStage('movies_top100.jsonl') as output:
+        movies_lst, movies = asyncio.run(crawl(sys.argv[1] if len(sys.argv) > 1 else url, cache, output, graph))
+    graph.save('link_graph.npz')
+    for num, (urls, introduction) in enumerate(movies, 1):
         print(num, urls, '\n','Movie:' + urls.split('/')[-1])
-        print('Movie info:' + movie_content.string.strip())
-        table.write(line, 0, num)
-        table.write(line, 1, urls)
-        table.write(line, 2, urls.split('/')[-1])
-        table.write(line, 3, movie_content.string.strip())
-        line += 1
-        workbook.save('movies_top100.xls')
-    except TypeError:
-        pass
+        print('Movie info:' + introduction)
+    export_workbook('movies_top100.jsonl', 'movies_top100.xls')
 
 
 #SAMPLE OUTPUT
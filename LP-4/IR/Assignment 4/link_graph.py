@@ -0,0 +1,75 @@
+from array import array
+
+import numpy as np
+
+
+# Outgoing-link graph recorded during a crawl. Every URL gets a dense integer
+# id and edges are kept as two packed uint32 arrays (source id, target id),
+# about 8 bytes per edge. save() writes them with the URL table to an .npz
+# file that "Assignment 2/pagerank.py" ranks; load() continues a graph from
+# an earlier run. A page recorded again in a later run replaces its old
+# outgoing edges, so re-crawls pick up changed links; within one run a page
+# is only added once.
+
+
+class LinkGraph:
+
+    def __init__(self):
+        self.ids = {}
+        self.urls = []
+        self.src = array('I')
+        self.dst = array('I')
+        self.recorded = set()
+        # Edges before `loaded` come from an earlier run; those leaving a
+        # node in `stale` were superseded in this run and are dropped on save.
+        self.loaded = 0
+        self.stale = set()
+
+    @classmethod
+    def load(cls, path):
+        graph = cls()
+        data = np.load(path)
+        if data['urls'].size:
+            graph.urls = data['urls'].tobytes().decode('utf-8').split("\n")
+        graph.ids = {url: node_id for node_id, url in enumerate(graph.urls)}
+        graph.src.frombytes(data['src'].astype(np.uint32).tobytes())
+        graph.dst.frombytes(data['dst'].astype(np.uint32).tobytes())
+        graph.loaded = len(graph.src)
+        return graph
+
+    def node(self, url):
+        node_id = self.ids.get(url)
+        if node_id is None:
+            node_id = self.ids[url] = len(self.urls)
+            self.urls.append(url)
+        return node_id
+
+    def add_page(self, url, links):
+        if url in self.recorded:
+            return
+        self.recorded.add(url)
+        source = self.node(url)
+        self.stale.add(source)
+        for link in dict.fromkeys(links):
+            if link != url:
+                self.src.append(source)
+                self.dst.append(self.node(link))
+
+    def edges(self):
+        # (src, dst) arrays without the superseded edges of earlier runs.
+        src = np.frombuffer(self.src, dtype=np.uint32)
+        dst = np.frombuffer(self.dst, dtype=np.uint32)
+        if not self.loaded or not self.stale:
+            return src, dst
+        keep = np.ones(len(src), dtype=bool)
+        keep[:self.loaded] = ~np.isin(src[:self.loaded], np.fromiter(self.stale, dtype=np.uint32))
+        return src[keep], dst[keep]
+
+    def save(self, path):
+        src, dst = self.edges()
+        np.savez_compressed(
+            path,
+            src=src,
+            dst=dst,
+            urls=np.frombuffer("\n".join(self.urls).encode('utf-8'), dtype=np.uint8))
+
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+
+
+# Persistent page cache for incremental re-crawls. For every URL it keeps
+# the last body, its ETag / Last-Modified validators, a hash of the body
+# and the parse results computed from it, one per parser name. The crawler
+# turns the validators into conditional requests; a 304, or a 200 whose
+# body hashes the same as before, reuses the stored parse result instead of
+# parsing again.
+
+CACHE_FILE = ".page_cache.sqlite"
+
+# Stored as PRAGMA user_version. 0: result held one bare parse result;
+# 1: result is a JSON object keyed by parser name.
+SCHEMA_VERSION = 1
+
+MISSING = object()
+
+
+class PageCache:
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.db = sqlite3.connect(cache_file)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, digest BLOB,"
+            " body BLOB, result TEXT, fetched REAL)")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            # Parse results are derived data; results in an older layout are
+            # dropped and recomputed, while bodies and validators are kept.
+            self.db.execute("UPDATE pages SET result = NULL")
+            self.db.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+            self.db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def validators(self, url):
+        row = self.db.execute("SELECT etag, last_modified FROM pages WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row is not None:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def body(self, url):
+        row = self.db.execute("SELECT body FROM pages WHERE url = ?", (url,)).fetchone()
+        return zlib.decompress(row[0]) if row is not None else None
+
+    def store(self, url, headers, body):
+        # Returns False when the body is identical to the cached one.
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        row = self.db.execute("SELECT digest FROM pages WHERE url = ?", (url,)).fetchone()
+
+        if row is not None and row[0] == digest:
+            self.db.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, fetched = ? WHERE url = ?",
+                (etag, last_modified, time.time(), url))
+            self.db.commit()
+            return False
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, NULL, ?)",
+            (url, etag, last_modified, digest, zlib.compress(body), time.time()))
+        self.db.commit()
+        return True
+
+    def results(self, url):
+        row = self.db.execute("SELECT result FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or row[0] is None:
+            return {}
+        results = json.loads(row[0])
+        return results if isinstance(results, dict) else {}
+
+    def result(self, url, name):
+        return self.results(url).get(name, MISSING)
+
+    def store_result(self, url, name, result):
+        # Returns the result as result() will give it back later (tuples
+        # become lists), so fresh and cached results have the same types.
+        results = self.results(url)
+        results[name] = result
+        encoded = json.dumps(results)
+        self.db.execute("UPDATE pages SET result = ? WHERE url = ?", (encoded, url))
+        self.db.commit()
+        return json.loads(encoded)[name]
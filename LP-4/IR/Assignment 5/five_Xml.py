@@ -1,4 +1,8 @@
+import sys
 import xml.dom.minidom
+import xml.etree.ElementTree as ET
+from xml_stream import iter_attribute, append_elements
+from xml_index import IndexedDocument
 
 def main():
     # use the parse() function to load and parse an XML file
@@ -7,22 +11,47 @@ def main():
     # print out the document node and the name of the first child tag
     print (doc.nodeName)
     print (doc.firstChild.tagName)
+    # index the tags once so the lookups below do not walk the tree
+    index = IndexedDocument(doc)
     # get a list of XML tags from the document and print each one
-    expertise = doc.getElementsByTagName("expertise")
-    print ("%d expertise:" % expertise.length)
+    expertise = index.getElementsByTagName("expertise")
+    print ("%d expertise:" % len(expertise))
     for skill in expertise:
         print (skill.getAttribute("name"))
 
     # Write a new XML tag and add it into the document
-    newexpertise = doc.createElement("expertise")
-    newexpertise.setAttribute("name", "BigData")
-    doc.firstChild.appendChild(newexpertise)
+    newexpertise = index.createElement("expertise")
+    index.setAttribute(newexpertise, "name", "BigData")
+    index.appendChild(doc.firstChild, newexpertise)
     print (" ")
 
-    expertise = doc.getElementsByTagName("expertise")
-    print ("%d expertise:" % expertise.length)
+    expertise = index.getElementsByTagName("expertise")
+    print ("%d expertise:" % len(expertise))
     for skill in expertise:
         print (skill.getAttribute("name"))
 
+# Same steps as main() for documents too large for minidom: the expertise
+# names are streamed with iterparse and the new tag is streamed into a copy
+# of the document written to out_path.
+def main_stream(path="Myxml.xml", out_path="Myxml_out.xml"):
+    names = list(iter_attribute(path, "expertise", "name"))
+    print ("%d expertise:" % len(names))
+    for name in names:
+        print (name)
+
+    newexpertise = ET.Element("expertise")
+    newexpertise.set("name", "BigData")
+    append_elements(path, out_path, [newexpertise])
+    print (" ")
+
+    count = 0
+    for name in iter_attribute(out_path, "expertise", "name"):
+        count += 1
+        print (name)
+    print ("%d expertise in %s" % (count, out_path))
+
 if __name__ == "__main__":
-    main();
\ No newline at end of file
+    if sys.argv[1:2] == ["--stream"]:
+        main_stream(*sys.argv[2:4]);
+    else:
+        main();
\ No newline at end of file
@@ -0,0 +1,148 @@
+import sys
+import time
+import xml.dom.minidom
+
+
+# Indexed wrapper around a minidom document. One pass over the tree builds
+# tag -> elements and (tag, attribute, value) -> elements maps, so repeated
+# getElementsByTagName / attribute lookups cost O(1) plus the result size
+# instead of a full traversal. Changes made through the wrapper
+# (appendChild, insertBefore, removeChild, setAttribute, removeAttribute)
+# keep both maps up to date. Results come back in the order elements were
+# indexed, which is document order unless nodes are inserted mid-document.
+
+
+class IndexedDocument:
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.by_tag = {}
+        self.by_attr = {}
+        self.index_subtree(doc.documentElement)
+
+    @classmethod
+    def parse(cls, path):
+        return cls(xml.dom.minidom.parse(path))
+
+    def elements(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.nodeType == node.ELEMENT_NODE:
+                yield node
+                stack.extend(reversed(node.childNodes))
+
+    def index_element(self, elem):
+        self.by_tag.setdefault(elem.tagName, {})[elem] = None
+        for name, value in elem.attributes.items():
+            self.by_attr.setdefault((elem.tagName, name, value), {})[elem] = None
+
+    def unindex_element(self, elem):
+        self.by_tag[elem.tagName].pop(elem, None)
+        for name, value in elem.attributes.items():
+            self.by_attr.get((elem.tagName, name, value), {}).pop(elem, None)
+
+    def index_subtree(self, node):
+        for elem in self.elements(node):
+            self.index_element(elem)
+
+    def unindex_subtree(self, node):
+        for elem in self.elements(node):
+            self.unindex_element(elem)
+
+    def indexed(self, elem):
+        return elem in self.by_tag.get(elem.tagName, ())
+
+    # --- Queries ---
+
+    def getElementsByTagName(self, tag):
+        return list(self.by_tag.get(tag, ()))
+
+    def getElementsByAttribute(self, tag, name, value):
+        return list(self.by_attr.get((tag, name, value), ()))
+
+    # --- Mutations ---
+
+    def createElement(self, tag):
+        # Not indexed until it is attached to the document.
+        return self.doc.createElement(tag)
+
+    def appendChild(self, parent, child):
+        self.detach(child)
+        parent.appendChild(child)
+        if self.indexed(parent):
+            self.index_subtree(child)
+        return child
+
+    def insertBefore(self, parent, child, ref):
+        self.detach(child)
+        parent.insertBefore(child, ref)
+        if self.indexed(parent):
+            self.index_subtree(child)
+        return child
+
+    def removeChild(self, parent, child):
+        if self.indexed(child):
+            self.unindex_subtree(child)
+        return parent.removeChild(child)
+
+    def detach(self, node):
+        # minidom moves a node that already has a parent; unindex it first.
+        if node.parentNode is not None:
+            self.removeChild(node.parentNode, node)
+
+    def setAttribute(self, elem, name, value):
+        indexed = self.indexed(elem)
+        if indexed and elem.hasAttribute(name):
+            self.by_attr.get((elem.tagName, name, elem.getAttribute(name)), {}).pop(elem, None)
+        elem.setAttribute(name, value)
+        if indexed:
+            self.by_attr.setdefault((elem.tagName, name, value), {})[elem] = None
+
+    def removeAttribute(self, elem, name):
+        if self.indexed(elem):
+            self.by_attr.get((elem.tagName, name, elem.getAttribute(name)), {}).pop(elem, None)
+        elem.removeAttribute(name)
+
+
+# --- Benchmark: indexed lookups against minidom traversal ---
+
+def sample_document(n_elements):
+    skills = ["SQL", "Python", "Testing", "Business", "Java", "Cloud"]
+    body = "".join('<expertise name="%s"/><project id="%d"/>' % (skills[i % len(skills)], i) for i in range(n_elements))
+    return xml.dom.minidom.parseString("<employee><fname>Sohan</fname>%s</employee>" % body)
+
+
+def benchmark(n_elements=5000, queries=200):
+    doc = sample_document(n_elements)
+
+    start = time.perf_counter()
+    for i in range(queries):
+        expertise = doc.getElementsByTagName("expertise")
+        python = [e for e in expertise if e.getAttribute("name") == "Python"]
+        if i % 10 == 0:
+            new = doc.createElement("expertise")
+            new.setAttribute("name", "BigData")
+            doc.documentElement.appendChild(new)
+    minidom_time = time.perf_counter() - start
+
+    doc = sample_document(n_elements)
+    start = time.perf_counter()
+    indexed = IndexedDocument(doc)
+    build_time = time.perf_counter() - start
+    for i in range(queries):
+        expertise = indexed.getElementsByTagName("expertise")
+        python = indexed.getElementsByAttribute("expertise", "name", "Python")
+        if i % 10 == 0:
+            new = indexed.createElement("expertise")
+            indexed.setAttribute(new, "name", "BigData")
+            indexed.appendChild(doc.documentElement, new)
+    indexed_time = time.perf_counter() - start
+
+    print("%d elements, %d query rounds (one append every 10)" % (2 * n_elements + 2, queries))
+    print("minidom traversal : %0.3f s" % minidom_time)
+    print("indexed document  : %0.3f s (including index build %0.3f s)" % (indexed_time, build_time))
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,87 @@
+import os
+import xml.etree.ElementTree as ET
+
+
+# Streaming counterparts of the minidom calls in five_Xml.py, for documents
+# too large to load. Elements are read with iterparse and every finished
+# element is dropped once it has been handled, however deeply it is nested,
+# so memory stays flat however long the document is. New elements are appended by copying
+# the original bytes through and writing them just before the root's
+# closing tag, without parsing the document at all.
+
+COPY_SIZE = 1 << 20
+TAIL_SIZE = 64 * 1024
+
+
+def iter_elements(path, tag):
+    # Yields each <tag> element as soon as it is complete. The element is
+    # cleared once the caller moves on, so read what you need from it inside
+    # the loop. Any finished element outside a <tag> is removed from its
+    # parent at any depth, so wrapper elements never collect children.
+    stack = []
+    open_matches = 0
+
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            if elem.tag == tag:
+                open_matches += 1
+            continue
+
+        stack.pop()
+        matched = elem.tag == tag
+        if matched:
+            open_matches -= 1
+            yield elem
+        # Elements inside an unfinished <tag> are kept for the caller.
+        if open_matches == 0:
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+
+def iter_attribute(path, tag, attribute):
+    for elem in iter_elements(path, tag):
+        yield elem.get(attribute)
+
+
+def root_close_offset(path):
+    # Offset of the root's closing tag: the last end tag in the file, found
+    # by scanning backwards from the end.
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        position = size
+        carry = b''
+        while position > 0:
+            start = max(0, position - TAIL_SIZE)
+            f.seek(start)
+            block = f.read(position - start) + carry
+            index = block.rfind(b'</')
+            if index != -1:
+                return start + index
+            carry = block[:1]
+            position = start
+    raise ValueError("no closing tag found in %s" % path)
+
+
+def append_elements(src, dst, elements, encoding='utf-8'):
+    # Copies src to dst with `elements` added as the last children of the root.
+    offset = root_close_offset(src)
+
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        remaining = offset
+        while remaining:
+            chunk = fin.read(min(COPY_SIZE, remaining))
+            if not chunk:
+                break
+            fout.write(chunk)
+            remaining -= len(chunk)
+
+        for elem in elements:
+            fout.write(ET.tostring(elem, encoding='unicode').encode(encoding) + b'\n')
+
+        while True:
+            chunk = fin.read(COPY_SIZE)
+            if not chunk:
+                break
+            fout.write(chunk)
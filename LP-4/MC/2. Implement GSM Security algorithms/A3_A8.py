@@ -136,61 +136,56 @@ def comp128(rand, key) :
   return simoutput
 
 
-#Test
-
-key   = "0x048BC1EA93B0F82733D67C19267C91D6"
-rand1 = "0x1D000000000000009900000000000000"
-rand2 = "0x3E00000000000000C100000000000000"
-
-#Compare with Original C version
-import subprocess
-
-def callOriginal(r, k) :
-    sout = ""
-    proc = subprocess.Popen(["./main", r, k], stdout=subprocess.PIPE)
-    try:
-        sout, serr = proc.communicate(timeout=5) #5 seconds should be good?
-    except TimeoutExpired:
-        proc.kill() #kill the process
-        sout, serr = proc.communicate()
-        print("Process Killed")
-        print("stdout")
-        print(sout)
-        print("stderr")
-        print(serr)
-    return sout
-
-oout1 = callOriginal(rand1, key)
-oout2 = callOriginal(rand2, key)
-
-
-key_ia = [int(_) for _ in bytearray.fromhex(key[2:])]
-rand1_ia = [int(_) for _ in bytearray.fromhex(rand1[2:])]
-rand2_ia = [int(_) for _ in bytearray.fromhex(rand2[2:])]
-out1 = comp128(rand1_ia, key_ia)
-out2 = comp128(rand2_ia, key_ia)
-
-key_hex   = [format(_, "02X") for _ in key_ia]
-rand1_hex = [format(_, "02X") for _ in rand1_ia]
-rand2_hex = [format(_, "02X") for _ in rand2_ia]
-out1_hex  = [format(_, "02X") for _ in out1]
-out2_hex  = [format(_, "02X") for _ in out2]
-key_str   = "".join(key_hex)
-rand1_str = "".join(rand1_hex)
-rand2_str = "".join(rand2_hex)
-out1_str  = "".join(out1_hex)
-out2_str  = "".join(out2_hex)
-
-print ("Output from original program")
-print ("A3A8(%s,%s) = %s" % (rand1_str, key_str, (oout1.decode("ascii")))) #Print it out as ascii
-print ("A3A8(%s,%s) = %s" % (rand2_str, key_str, (oout2.decode("ascii")))) #Print it out as ascii
-
-print ("Output from this script")
-print ("A3A8(%s,%s) = %s" % (rand1_str, key_str, out1_str))
-print ("A3A8(%s,%s) = %s" % (rand2_str, key_str, out1_str))
-
-
-
-
-  
- 
+if __name__ == "__main__":
+  #Test
+
+  key   = "0x048BC1EA93B0F82733D67C19267C91D6"
+  rand1 = "0x1D000000000000009900000000000000"
+  rand2 = "0x3E00000000000000C100000000000000"
+
+  #Compare with Original C version
+  import subprocess
+
+  def callOriginal(r, k) :
+      sout = ""
+      proc = subprocess.Popen(["./main", r, k], stdout=subprocess.PIPE)
+      try:
+          sout, serr = proc.communicate(timeout=5) #5 seconds should be good?
+      except subprocess.TimeoutExpired:
+          proc.kill() #kill the process
+          sout, serr = proc.communicate()
+          print("Process Killed")
+          print("stdout")
+          print(sout)
+          print("stderr")
+          print(serr)
+      return sout
+
+  oout1 = callOriginal(rand1, key)
+  oout2 = callOriginal(rand2, key)
+
+
+  key_ia = [int(_) for _ in bytearray.fromhex(key[2:])]
+  rand1_ia = [int(_) for _ in bytearray.fromhex(rand1[2:])]
+  rand2_ia = [int(_) for _ in bytearray.fromhex(rand2[2:])]
+  out1 = comp128(rand1_ia, key_ia)
+  out2 = comp128(rand2_ia, key_ia)
+
+  key_hex   = [format(_, "02X") for _ in key_ia]
+  rand1_hex = [format(_, "02X") for _ in rand1_ia]
+  rand2_hex = [format(_, "02X") for _ in rand2_ia]
+  out1_hex  = [format(_, "02X") for _ in out1]
+  out2_hex  = [format(_, "02X") for _ in out2]
+  key_str   = "".join(key_hex)
+  rand1_str = "".join(rand1_hex)
+  rand2_str = "".join(rand2_hex)
+  out1_str  = "".join(out1_hex)
+  out2_str  = "".join(out2_hex)
+
+  print ("Output from original program")
+  print ("A3A8(%s,%s) = %s" % (rand1_str, key_str, (oout1.decode("ascii")))) #Print it out as ascii
+  print ("A3A8(%s,%s) = %s" % (rand2_str, key_str, (oout2.decode("ascii")))) #Print it out as ascii
+
+  print ("Output from this script")
+  print ("A3A8(%s,%s) = %s" % (rand1_str, key_str, out1_str))
+  print ("A3A8(%s,%s) = %s" % (rand2_str, key_str, out2_str))
@@ -0,0 +1,247 @@
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+# A5/1 keystream generator: three LFSRs of 19, 22 and 23 bits with the same
+# taps, clocking bits and majority rule as A5.c, plus the key and frame
+# loading that A5.c leaves out. Bit i of a register is cell i of the arrays
+# in A5.c: feedback enters at bit 0 and the output is the top bit.
+#
+# keystream() runs one (Kc, frame) pair. keystream_batch() is bit-sliced:
+# bit i of a register for 64 different streams is held in one uint64 word,
+# so each clock step is a handful of word operations over all streams, and
+# the majority rule becomes a per-stream clock-enable mask.
+#
+# Kc is the 8 bytes after SRES in the A3A8 output of comp128(); frame is the
+# 22-bit COUNT derived from the TDMA frame number.
+
+R1_BITS, R2_BITS, R3_BITS = 19, 22, 23
+R1_TAPS, R2_TAPS, R3_TAPS = (13, 16, 17, 18), (20, 21), (7, 20, 21, 22)
+R1_MID, R2_MID, R3_MID = 8, 10, 10
+
+FRAME_BITS = 22
+BURST_BITS = 114
+BURST_BYTES = 15
+
+CHUNK = 1 << 16
+
+REFERENCE = "./a51"
+
+
+def session_key(simoutput):
+    # Kc from the 12-byte A3A8 output (SRES is the first 4 bytes).
+    return bytes(simoutput[4:12])
+
+
+# --- One stream at a time ---
+
+def clock_register(reg, size, taps):
+    feedback = 0
+    for tap in taps:
+        feedback ^= (reg >> tap) & 1
+    return ((reg << 1) & ((1 << size) - 1)) | feedback
+
+
+def clock_all(regs):
+    regs[0] = clock_register(regs[0], R1_BITS, R1_TAPS)
+    regs[1] = clock_register(regs[1], R2_BITS, R2_TAPS)
+    regs[2] = clock_register(regs[2], R3_BITS, R3_TAPS)
+
+
+def clock_majority(regs):
+    x, y, z = (regs[0] >> R1_MID) & 1, (regs[1] >> R2_MID) & 1, (regs[2] >> R3_MID) & 1
+    majority = (x + y + z) >= 2
+    if x == majority:
+        regs[0] = clock_register(regs[0], R1_BITS, R1_TAPS)
+    if y == majority:
+        regs[1] = clock_register(regs[1], R2_BITS, R2_TAPS)
+    if z == majority:
+        regs[2] = clock_register(regs[2], R3_BITS, R3_TAPS)
+
+
+def output_bit(regs):
+    return ((regs[0] >> (R1_BITS - 1)) ^ (regs[1] >> (R2_BITS - 1)) ^ (regs[2] >> (R3_BITS - 1))) & 1
+
+
+def key_setup(kc, frame):
+    regs = [0, 0, 0]
+    for i in range(64):
+        clock_all(regs)
+        bit = (kc[i // 8] >> (i & 7)) & 1
+        regs = [reg ^ bit for reg in regs]
+    for i in range(FRAME_BITS):
+        clock_all(regs)
+        bit = (frame >> i) & 1
+        regs = [reg ^ bit for reg in regs]
+    for i in range(100):
+        clock_majority(regs)
+    return regs
+
+
+def keystream(kc, frame):
+    # Returns the A->B and B->A keystreams, 114 bits each, as 15 bytes with
+    # the first bit in the top bit of the first byte.
+    regs = key_setup(kc, frame)
+    bursts = []
+    for _ in range(2):
+        burst = bytearray(BURST_BYTES)
+        for i in range(BURST_BITS):
+            clock_majority(regs)
+            burst[i // 8] |= output_bit(regs) << (7 - (i & 7))
+        bursts.append(bytes(burst))
+    return tuple(bursts)
+
+
+# --- Bit-sliced bulk mode ---
+
+def slice_bits(bits):
+    # (streams, nbits) 0/1 array -> (nbits, words) uint64, stream s in bit
+    # s % 64 of word s // 64.
+    streams = bits.shape[0]
+    padded = np.zeros((bits.shape[1], -(-streams // 64) * 64), dtype=np.uint8)
+    padded[:, :streams] = bits.T
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8')
+
+
+def unslice_bits(words, streams):
+    # Inverse of slice_bits: (nbits, words) -> (streams, nbits) 0/1 array.
+    bits = np.unpackbits(words.astype('<u8', copy=False).view(np.uint8), axis=1, bitorder='little')
+    return bits[:, :streams].T
+
+
+def feedback(reg, taps):
+    f = reg[taps[0]].copy()
+    for tap in taps[1:]:
+        f ^= reg[tap]
+    return f
+
+
+def shift_all(reg, taps, bit):
+    f = feedback(reg, taps)
+    reg[1:] = reg[:-1]
+    reg[0] = f ^ bit
+
+
+def shift_enabled(reg, taps, enable):
+    # Clocks the register only in the streams whose bit is set in enable.
+    f = feedback(reg, taps)
+    reg[1:] ^= (reg[:-1] ^ reg[1:]) & enable
+    reg[0] ^= (f ^ reg[0]) & enable
+
+
+def keystream_chunk(kcs, frames):
+    streams = kcs.shape[0]
+    key_bits = slice_bits(np.unpackbits(kcs, axis=1, bitorder='little'))
+    frame_bits = slice_bits(((frames[:, None] >> np.arange(FRAME_BITS)) & 1).astype(np.uint8))
+    words = key_bits.shape[1]
+    ones = np.full(words, ~np.uint64(0))
+
+    r1 = np.zeros((R1_BITS, words), dtype=np.uint64)
+    r2 = np.zeros((R2_BITS, words), dtype=np.uint64)
+    r3 = np.zeros((R3_BITS, words), dtype=np.uint64)
+    registers = ((r1, R1_TAPS), (r2, R2_TAPS), (r3, R3_TAPS))
+
+    for bits in (key_bits, frame_bits):
+        for bit in bits:
+            for reg, taps in registers:
+                shift_all(reg, taps, bit)
+
+    out = np.empty((2 * BURST_BITS, words), dtype=np.uint64)
+    for step in range(-100, 2 * BURST_BITS):
+        x, y, z = r1[R1_MID], r2[R2_MID], r3[R3_MID]
+        majority = (x & y) | (x & z) | (y & z)
+        shift_enabled(r1, R1_TAPS, ones ^ x ^ majority)
+        shift_enabled(r2, R2_TAPS, ones ^ y ^ majority)
+        shift_enabled(r3, R3_TAPS, ones ^ z ^ majority)
+        if step >= 0:
+            out[step] = r1[-1] ^ r2[-1] ^ r3[-1]
+
+    bits = unslice_bits(out, streams)
+    padding = np.zeros((streams, 8 * BURST_BYTES - BURST_BITS), dtype=np.uint8)
+    atob = np.packbits(np.concatenate([bits[:, :BURST_BITS], padding], axis=1), axis=1)
+    btoa = np.packbits(np.concatenate([bits[:, BURST_BITS:], padding], axis=1), axis=1)
+    return atob, btoa
+
+
+def keystream_batch(kcs, frames):
+    # kcs: (streams, 8) bytes, frames: (streams,) frame numbers ->
+    # (streams, 15) uint8 A->B and B->A keystreams, as keystream() returns.
+    kcs = np.asarray(kcs, dtype=np.uint8).reshape(-1, 8)
+    frames = np.asarray(frames, dtype=np.int64) & ((1 << FRAME_BITS) - 1)
+    atob = np.empty((kcs.shape[0], BURST_BYTES), dtype=np.uint8)
+    btoa = np.empty((kcs.shape[0], BURST_BYTES), dtype=np.uint8)
+    for start in range(0, kcs.shape[0], CHUNK):
+        end = start + CHUNK
+        atob[start:end], btoa[start:end] = keystream_chunk(kcs[start:end], frames[start:end])
+    return atob, btoa
+
+
+def frame_range(kc, start, count):
+    # Keystreams for one Kc over frames start, start + 1, ... (mod 2^22).
+    kcs = np.broadcast_to(np.frombuffer(bytes(kc), dtype=np.uint8), (count, 8))
+    return keystream_batch(kcs, np.arange(start, start + count))
+
+
+# --- Cross-check against the C reference (a51_ref.c) ---
+
+def reference_keystreams(kcs, frames, path=REFERENCE):
+    # Streams every pair through one ./a51 process in its stdin mode.
+    lines = "".join("%s %X\n" % (bytes(kc).hex(), frame) for kc, frame in zip(kcs.tolist(), frames.tolist()))
+    proc = subprocess.Popen([path], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def write():
+        proc.stdin.write(lines.encode("ascii"))
+        proc.stdin.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    out = proc.stdout.read().decode("ascii").split()
+    writer.join()
+    proc.wait()
+    if len(out) != 2 * len(kcs):
+        raise RuntimeError("%s returned %d keystreams for %d inputs" % (path, len(out), 2 * len(kcs)))
+    data = np.frombuffer(bytes.fromhex("".join(out)), dtype=np.uint8).reshape(-1, 2, BURST_BYTES)
+    return data[:, 0], data[:, 1]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    path = sys.argv[2] if len(sys.argv) > 2 else REFERENCE
+
+    # Test vector published with the reference implementation.
+    kc = bytes.fromhex("12 23 45 67 89 AB CD EF")
+    expected = (bytes.fromhex("534EAA582FE8151AB6E1855A728C00"), bytes.fromhex("24FD35A35D5FB6526D32F906DF1AC0"))
+    assert keystream(kc, 0x134) == expected
+    atob, btoa = keystream_batch([list(kc)], [0x134])
+    assert (atob[0].tobytes(), btoa[0].tobytes()) == expected
+    print("test vector OK")
+
+    rng = np.random.default_rng()
+    kcs = rng.integers(0, 256, size=(count, 8), dtype=np.uint8)
+    frames = rng.integers(0, 1 << FRAME_BITS, size=count)
+
+    start = time.perf_counter()
+    atob, btoa = keystream_batch(kcs, frames)
+    batch_time = time.perf_counter() - start
+
+    check = min(count, 500)
+    start = time.perf_counter()
+    for i in range(check):
+        assert keystream(kcs[i].tobytes(), int(frames[i])) == (atob[i].tobytes(), btoa[i].tobytes())
+    scalar_time = (time.perf_counter() - start) * count / check
+
+    print("%d streams: bit-sliced %.2f s, scalar %.2f s (extrapolated from %d)" % (count, batch_time, scalar_time, check))
+
+    try:
+        ref_atob, ref_btoa = reference_keystreams(kcs, frames, path)
+    except OSError:
+        print("%s not found, skipping the C cross-check" % path)
+    else:
+        bad = np.flatnonzero((ref_atob != atob).any(axis=1) | (ref_btoa != btoa).any(axis=1))
+        for i in bad[:10]:
+            print("MISMATCH Kc %s frame %X" % (kcs[i].tobytes().hex().upper(), frames[i]))
+        print("%d streams checked against %s, %d mismatches" % (count, path, len(bad)))
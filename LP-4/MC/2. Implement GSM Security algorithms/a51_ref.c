@@ -0,0 +1,189 @@
+/*
+ * A5/1 reference, after the pedagogical implementation by Marc Briceno,
+ * Ian Goldberg and David Wagner. Same registers, taps and majority clocking
+ * as A5.c, plus key and frame loading.
+ *
+ *   ./a51 KC FRAME       print the A->B and B->A keystreams (15 bytes each,
+ *                        114 bits used) for a 16-digit hex Kc and a hex
+ *                        22-bit frame number
+ *   ./a51                stream mode for a51.py: read "KC FRAME" lines from
+ *                        stdin and print "ATOB BTOA" per line; an empty
+ *                        line flushes stdout
+ *
+ * Build: gcc -O2 -o a51 a51_ref.c
+ */
+#include <stdio.h>
+#include <string.h>
+
+typedef unsigned char byte;
+typedef unsigned long word;
+typedef word bit;
+
+#define R1MASK	0x07FFFF /* 19 bits, numbered 0..18 */
+#define R2MASK	0x3FFFFF /* 22 bits, numbered 0..21 */
+#define R3MASK	0x7FFFFF /* 23 bits, numbered 0..22 */
+
+#define R1MID	0x000100 /* bit 8 */
+#define R2MID	0x000400 /* bit 10 */
+#define R3MID	0x000400 /* bit 10 */
+
+#define R1TAPS	0x072000 /* bits 18,17,16,13 */
+#define R2TAPS	0x300000 /* bits 21,20 */
+#define R3TAPS	0x700080 /* bits 22,21,20,7 */
+
+#define R1OUT	0x040000 /* bit 18 (the high bit) */
+#define R2OUT	0x200000 /* bit 21 (the high bit) */
+#define R3OUT	0x400000 /* bit 22 (the high bit) */
+
+static word R1, R2, R3;
+
+static bit parity(word x)
+{
+	x ^= x>>16;
+	x ^= x>>8;
+	x ^= x>>4;
+	x ^= x>>2;
+	x ^= x>>1;
+	return x&1;
+}
+
+static word clockone(word reg, word mask, word taps)
+{
+	word t = reg & taps;
+	reg = (reg << 1) & mask;
+	reg |= parity(t);
+	return reg;
+}
+
+static bit majority(void)
+{
+	int sum;
+	sum = parity(R1&R1MID) + parity(R2&R2MID) + parity(R3&R3MID);
+	return sum >= 2;
+}
+
+static void clock(void)
+{
+	bit maj = majority();
+	if (((R1&R1MID)!=0) == maj)
+		R1 = clockone(R1, R1MASK, R1TAPS);
+	if (((R2&R2MID)!=0) == maj)
+		R2 = clockone(R2, R2MASK, R2TAPS);
+	if (((R3&R3MID)!=0) == maj)
+		R3 = clockone(R3, R3MASK, R3TAPS);
+}
+
+static void clockallthree(void)
+{
+	R1 = clockone(R1, R1MASK, R1TAPS);
+	R2 = clockone(R2, R2MASK, R2TAPS);
+	R3 = clockone(R3, R3MASK, R3TAPS);
+}
+
+static bit getbit(void)
+{
+	return parity(R1&R1OUT)^parity(R2&R2OUT)^parity(R3&R3OUT);
+}
+
+static void keysetup(const byte key[8], word frame)
+{
+	int i;
+	bit keybit, framebit;
+
+	R1 = R2 = R3 = 0;
+
+	for (i=0; i<64; i++) {
+		clockallthree();
+		keybit = (key[i/8] >> (i&7)) & 1; /* The i-th bit of the key */
+		R1 ^= keybit; R2 ^= keybit; R3 ^= keybit;
+	}
+
+	for (i=0; i<22; i++) {
+		clockallthree();
+		framebit = (frame >> i) & 1; /* The i-th bit of the frame # */
+		R1 ^= framebit; R2 ^= framebit; R3 ^= framebit;
+	}
+
+	for (i=0; i<100; i++)
+		clock();
+}
+
+static void run(byte AtoBkeystream[], byte BtoAkeystream[])
+{
+	int i;
+
+	for (i=0; i<=113/8; i++)
+		AtoBkeystream[i] = BtoAkeystream[i] = 0;
+
+	for (i=0; i<114; i++) {
+		clock();
+		AtoBkeystream[i/8] |= getbit() << (7-(i&7));
+	}
+
+	for (i=0; i<114; i++) {
+		clock();
+		BtoAkeystream[i/8] |= getbit() << (7-(i&7));
+	}
+}
+
+static int parse_key(const char *s, byte key[8])
+{
+	int i;
+	unsigned int v;
+
+	if (s[0] == '0' && (s[1] == 'x' || s[1] == 'X'))
+		s += 2;
+	if (strlen(s) < 16)
+		return 0;
+	for (i=0; i<8; i++) {
+		if (sscanf(s + 2*i, "%2x", &v) != 1)
+			return 0;
+		key[i] = (byte)v;
+	}
+	return 1;
+}
+
+static void print_keystreams(const byte key[8], word frame)
+{
+	byte AtoB[15], BtoA[15];
+	int i;
+
+	keysetup(key, frame);
+	run(AtoB, BtoA);
+	for (i=0; i<15; i++)
+		printf("%02X", AtoB[i]);
+	putchar(' ');
+	for (i=0; i<15; i++)
+		printf("%02X", BtoA[i]);
+	putchar('\n');
+}
+
+int main(int argc, char **argv)
+{
+	byte key[8];
+	unsigned long frame;
+	char line[256], key_hex[80];
+
+	if (argc == 3) {
+		if (!parse_key(argv[1], key) || sscanf(argv[2], "%lx", &frame) != 1) {
+			fprintf(stderr, "usage: %s KC FRAME (16 hex digits, hex frame number)\n", argv[0]);
+			return 1;
+		}
+		print_keystreams(key, frame & 0x3FFFFF);
+		return 0;
+	}
+
+	while (fgets(line, sizeof line, stdin)) {
+		if (line[0] == '\n') {
+			fflush(stdout);
+			continue;
+		}
+		if (sscanf(line, "%79s %lx", key_hex, &frame) != 2 || !parse_key(key_hex, key)) {
+			printf("ERROR\n");
+			continue;
+		}
+		print_keystreams(key, frame & 0x3FFFFF);
+	}
+	fflush(stdout);
+	return 0;
+}
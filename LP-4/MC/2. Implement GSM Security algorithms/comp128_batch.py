@@ -0,0 +1,85 @@
+import sys
+import time
+
+import numpy as np
+
+from A3_A8 import s_table, comp128
+
+
+# Batched COMP128: the same rounds as comp128() in A3_A8.py, run on a whole
+# batch of (RAND, Ki) pairs at once. In each butterfly level the 16 (m, n)
+# pairs are disjoint, so a level is one gather, one table lookup and one
+# scatter over a (32, batch) array; bit expansion and the ((8*j+k)*17) % 128
+# permutation are precomputed index arrays. The output is bit-identical to
+# comp128().
+
+TABLES = [np.array(table, dtype=np.int32) for table in s_table]
+
+# Butterfly index pairs for each level j, in the order comp128() visits them.
+LEVELS = []
+for j in range(5):
+    m = np.array([l + k * (1 << (5 - j)) for k in range(1 << j) for l in range(1 << (4 - j))])
+    LEVELS.append((m, m + (1 << (4 - j)), 1 << (9 - j)))
+
+NIBBLE_SHIFTS = np.array([3, 2, 1, 0], dtype=np.int32)[None, :, None]
+PERMUTATION = np.array([[((8 * j + k) * 17) % 128 for k in range(8)] for j in range(16)])
+BYTE_SHIFTS = np.arange(7, -1, -1, dtype=np.int32)[None, :, None]
+
+CHUNK = 16384
+
+
+def comp128_chunk(rands, keys):
+    # Works on (32, batch) so each byte position is a contiguous row.
+    x = np.empty((32, rands.shape[0]), dtype=np.int32)
+    x[16:] = rands.T
+    keys = keys.T
+
+    for i in range(1, 9):
+        x[:16] = keys
+        for j, (m, n, modulus) in enumerate(LEVELS):
+            xm = x[m]
+            xn = x[n]
+            x[m] = TABLES[j].take((xm + 2 * xn) % modulus)
+            x[n] = TABLES[j].take((2 * xm + xn) % modulus)
+        if i < 8:
+            bits = ((x[:, None, :] >> NIBBLE_SHIFTS) & 1).reshape(128, -1)
+            x[16:] = (bits[PERMUTATION] << BYTE_SHIFTS).sum(axis=1)
+
+    out = np.zeros((12, x.shape[1]), dtype=np.int32)
+    out[0:4] = (x[0:8:2] << 4) | x[1:8:2]
+    out[4:10] = (x[18:30:2] << 6) | (x[19:31:2] << 2) | (x[20:32:2] >> 2)
+    out[10] = (x[30] << 6) | (x[31] << 2)
+    return (out.T & 0xFF).astype(np.uint8)
+
+
+def comp128_batch(rands, keys):
+    # rands, keys: (batch, 16) arrays of bytes -> (batch, 12) uint8 outputs.
+    rands = np.asarray(rands, dtype=np.int32)
+    keys = np.asarray(keys, dtype=np.int32)
+    out = np.empty((rands.shape[0], 12), dtype=np.uint8)
+    for start in range(0, rands.shape[0], CHUNK):
+        out[start:start + CHUNK] = comp128_chunk(rands[start:start + CHUNK], keys[start:start + CHUNK])
+    return out
+
+
+def random_vectors(count, rng=None):
+    rng = rng or np.random.default_rng()
+    return rng.integers(0, 256, size=(count, 16), dtype=np.uint8), rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rands, keys = random_vectors(count)
+
+    start = time.perf_counter()
+    out = comp128_batch(rands, keys)
+    batch_time = time.perf_counter() - start
+
+    check = min(count, 2000)
+    start = time.perf_counter()
+    for r in range(check):
+        assert comp128(rands[r].tolist(), keys[r].tolist()) == out[r].tolist()
+    scalar_time = (time.perf_counter() - start) * count / check
+
+    print("%d triplets: batch %.2f s, scalar %.2f s (extrapolated from %d)" % (count, batch_time, scalar_time, check))
+    print("first %d outputs identical to comp128()" % check)
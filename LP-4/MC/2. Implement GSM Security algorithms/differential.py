@@ -0,0 +1,277 @@
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from A3_A8 import comp128
+from comp128_batch import comp128_batch, random_vectors
+
+
+# Differential test of comp128 against the C reference (comp128_ref.c, built
+# as ./main). Instead of one ./main per vector, each reference process is
+# started once in stream mode and fed whole batches of "RAND KEY" lines; a
+# writer thread fills its stdin while the results are read back, so neither
+# pipe can fill up and block the other side. Several processes can run side
+# by side, one batch each. Any mismatch is shrunk to a minimal (RAND, Ki)
+# pair before it is reported.
+#
+# comp128_ref.c shares its S-box tables with A3_A8.py, so the differential
+# run cannot catch a table error. Known-answer vectors from a published
+# source (one "RAND KI OUTPUT" line each, 32/32/24 hex digits, # comments)
+# are checked against every implementation first with --kat FILE.
+#
+# Build the reference with:  gcc -O2 -o main comp128_ref.c
+
+REFERENCE = "./main"
+BATCH = 65536
+LINE = 24 + 1
+HEX = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+
+SAMPLE_KEY = bytes.fromhex("048BC1EA93B0F82733D67C19267C91D6")
+SAMPLE_RANDS = [bytes.fromhex("1D000000000000009900000000000000"),
+                bytes.fromhex("3E00000000000000C100000000000000")]
+
+
+def encode_lines(rands, keys):
+    # (batch, 16) RANDs and keys -> b"RANDHEX KEYHEX\n" for every pair.
+    data = np.concatenate([rands, keys], axis=1).astype(np.uint8)
+    digits = np.empty((data.shape[0], 32, 2), dtype=np.uint8)
+    digits[:, :, 0] = HEX[data >> 4]
+    digits[:, :, 1] = HEX[data & 0xF]
+    digits = digits.reshape(-1, 64)
+    lines = np.empty((data.shape[0], 66), dtype=np.uint8)
+    lines[:, :32] = digits[:, :32]
+    lines[:, 32] = ord(" ")
+    lines[:, 33:65] = digits[:, 32:]
+    lines[:, 65] = ord("\n")
+    return lines.tobytes()
+
+
+class ReferenceProcess:
+
+    def __init__(self, path=REFERENCE):
+        self.path = path
+        self.proc = subprocess.Popen([path], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def write(self, data):
+        self.proc.stdin.write(data)
+        # An empty line makes the reference flush its output.
+        self.proc.stdin.write(b"\n")
+        self.proc.stdin.flush()
+
+    def run(self, rands, keys):
+        # Returns the (batch, 12) uint8 outputs of the reference.
+        count = len(rands)
+        writer = threading.Thread(target=self.write, args=(encode_lines(rands, keys),))
+        writer.start()
+        out = self.proc.stdout.read(count * LINE)
+        writer.join()
+        if len(out) != count * LINE:
+            raise RuntimeError("%s exited after %d of %d outputs" % (self.path, len(out) // LINE, count))
+        # A rejected line comes back as "ERROR" padded to the output width.
+        error = out.find(b"ERROR")
+        if error != -1:
+            raise RuntimeError("%s rejected input line %d" % (self.path, error // LINE))
+        try:
+            result = bytes.fromhex(out.decode("ascii"))
+        except ValueError:
+            raise RuntimeError("%s returned malformed output" % self.path)
+        return np.frombuffer(result, dtype=np.uint8).reshape(count, 12)
+
+    def close(self):
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+def comp128_scalar(rands, keys):
+    return np.array([comp128(list(r), list(k)) for r, k in zip(rands.tolist(), keys.tolist())], dtype=np.uint8).reshape(-1, 12)
+
+
+# --- Vectors ---
+
+def edge_patterns():
+    patterns = [bytes(16), b"\xff" * 16, b"\x55" * 16, b"\xaa" * 16, SAMPLE_KEY] + SAMPLE_RANDS
+    for i in range(128):
+        single = bytearray(16)
+        single[i // 8] = 0x80 >> (i % 8)
+        patterns.append(bytes(single))
+        patterns.append(bytes(b ^ 0xff for b in single))
+    for value in range(256):
+        patterns.append(bytes([value]) * 16)
+    return np.frombuffer(b"".join(patterns), dtype=np.uint8).reshape(-1, 16)
+
+
+def edge_vectors():
+    # Every edge pattern as RAND against a few fixed keys and as key against
+    # a few fixed RANDs.
+    patterns = edge_patterns()
+    fixed = patterns[:5]
+    rands = np.concatenate([np.repeat(patterns, len(fixed), axis=0), np.tile(fixed, (len(patterns), 1))])
+    keys = np.concatenate([np.tile(fixed, (len(patterns), 1)), np.repeat(patterns, len(fixed), axis=0)])
+    return rands, keys
+
+
+def vector_batches(count, seed=None):
+    rng = np.random.default_rng(seed)
+    yield edge_vectors()
+    for start in range(0, count, BATCH):
+        yield random_vectors(min(BATCH, count - start), rng)
+
+
+# --- Known answers ---
+
+def load_known_answers(path):
+    # Returns (rands, keys, outputs) as uint8 arrays.
+    rows = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split("#", 1)[0].split()
+            if not fields:
+                continue
+            try:
+                rand, key, output = (bytes.fromhex(field) for field in fields)
+            except ValueError:
+                raise ValueError("%s:%d: expected RAND KI OUTPUT in hex" % (path, number))
+            if (len(rand), len(key), len(output)) != (16, 16, 12):
+                raise ValueError("%s:%d: RAND and KI need 16 bytes, OUTPUT 12" % (path, number))
+            rows.append(rand + key + output)
+    data = np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(-1, 44)
+    return data[:, :16], data[:, 16:32], data[:, 32:]
+
+
+def check_known_answers(rands, keys, outputs, path=REFERENCE):
+    # Returns [(implementation name, vector index)] for every wrong answer.
+    implementations = [("comp128", comp128_scalar), ("comp128_batch", comp128_batch)]
+    reference = ReferenceProcess(path)
+    try:
+        implementations.append((path, reference.run))
+        wrong = []
+        for name, implementation in implementations:
+            got = implementation(rands, keys)
+            wrong.extend((name, i) for i in np.flatnonzero((got != outputs).any(axis=1)))
+    finally:
+        reference.close()
+    return wrong
+
+
+# --- Minimization ---
+
+def differs(reference, python, rand, key):
+    rand = np.asarray(rand, dtype=np.uint8)[None]
+    key = np.asarray(key, dtype=np.uint8)[None]
+    return not np.array_equal(reference.run(rand, key), python(rand, key))
+
+
+def minimize(reference, python, rand, key):
+    # Greedily clears bytes, then single bits, of the failing (RAND, Ki)
+    # pair for as long as the outputs still disagree.
+    vector = bytearray(bytes(rand) + bytes(key))
+    for masks in ([0x00], [0xff ^ (1 << bit) for bit in range(8)]):
+        changed = True
+        while changed:
+            changed = False
+            for i in range(32):
+                for mask in masks:
+                    if vector[i] & mask == vector[i]:
+                        continue
+                    candidate = bytearray(vector)
+                    candidate[i] &= mask
+                    if differs(reference, python, candidate[:16], candidate[16:]):
+                        vector = candidate
+                        changed = True
+    return bytes(vector[:16]), bytes(vector[16:])
+
+
+# --- Driver ---
+
+def run(count, processes=1, path=REFERENCE, python=comp128_batch, seed=None, max_reports=10):
+    # Returns (vectors checked, list of (rand, key, minimal rand, minimal key)).
+    references = [ReferenceProcess(path) for _ in range(processes)]
+    free = list(references)
+    lock = threading.Lock()
+    checked = 0
+    failing = []
+
+    def reference_run(batch):
+        with lock:
+            reference = free.pop()
+        try:
+            return reference.run(*batch)
+        finally:
+            with lock:
+                free.append(reference)
+
+    def check(batch, expected):
+        rands, keys = batch
+        bad = np.flatnonzero((python(rands, keys) != expected).any(axis=1))
+        failing.extend((bytes(rands[i]), bytes(keys[i])) for i in bad[:max_reports - len(failing)])
+        return len(rands)
+
+    try:
+        with ThreadPoolExecutor(processes) as pool:
+            pending = []
+            for batch in vector_batches(count, seed):
+                pending.append((batch, pool.submit(reference_run, batch)))
+                if len(pending) >= processes:
+                    batch, future = pending.pop(0)
+                    checked += check(batch, future.result())
+            for batch, future in pending:
+                checked += check(batch, future.result())
+    finally:
+        for reference in references:
+            reference.close()
+
+    failures = []
+    if failing:
+        reference = ReferenceProcess(path)
+        try:
+            for rand, key in failing:
+                failures.append((rand, key) + minimize(reference, python, rand, key))
+        finally:
+            reference.close()
+    return checked, failures
+
+
+if __name__ == "__main__":
+    kat = None
+    if "--kat" in sys.argv:
+        at = sys.argv.index("--kat")
+        kat = sys.argv[at + 1]
+        del sys.argv[at:at + 2]
+    args = [arg for arg in sys.argv[1:] if arg != "--scalar"]
+    count = int(args[0]) if args else 1000000
+    processes = int(args[1]) if len(args) > 1 else 4
+    path = args[2] if len(args) > 2 else REFERENCE
+    python = comp128_scalar if "--scalar" in sys.argv else comp128_batch
+
+    if kat is None:
+        print("no --kat file given: the S-box tables are not checked against published vectors")
+    else:
+        rands, keys, outputs = load_known_answers(kat)
+        wrong = check_known_answers(rands, keys, outputs, path)
+        for name, i in wrong:
+            print("KNOWN ANSWER WRONG in %s: A3A8(%s,%s) should be %s"
+                  % (name, rands[i].tobytes().hex().upper(), keys[i].tobytes().hex().upper(), outputs[i].tobytes().hex().upper()))
+        print("%d known-answer vectors from %s, %d wrong answers" % (len(rands), kat, len(wrong)))
+        if wrong:
+            sys.exit(1)
+
+    start = time.perf_counter()
+    checked, failures = run(count, processes, path, python)
+    elapsed = time.perf_counter() - start
+
+    print("%d vectors (%d random + edge cases) against %s x%d in %.2f s, %.0f vectors/s"
+          % (checked, count, path, processes, elapsed, checked / elapsed))
+    for rand, key, min_rand, min_key in failures:
+        print("MISMATCH A3A8(%s,%s)" % (rand.hex().upper(), key.hex().upper()))
+        print("  minimal A3A8(%s,%s)" % (min_rand.hex().upper(), min_key.hex().upper()))
+    if not failures:
+        print("no mismatches")
+    sys.exit(1 if failures else 0)
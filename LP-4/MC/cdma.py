@@ -0,0 +1,144 @@
+import sys
+import time
+
+import numpy as np
+
+
+# Vectorized CDMA: N stations spread their symbols with rows of a
+# Walsh-Hadamard matrix. A whole block of symbols for every station is
+# encoded with one matrix product and every station is decoded at once with
+# another, instead of one np.multiply + sum per station as in 1_CDMA.py.
+#
+# Symbols are +1/-1 (0 for a silent station), as in 1_CDMA.py; chips for
+# symbol period s are row s of the (symbols, code_length) chip matrix.
+
+
+def walsh_codes(length):
+    # Sylvester construction: rows are mutually orthogonal +1/-1 codes.
+    if length < 1 or length & (length - 1):
+        raise ValueError("code length must be a power of two, got %d" % length)
+    codes = np.ones((1, 1), dtype=np.int8)
+    while codes.shape[0] < length:
+        codes = np.block([[codes, codes], [codes, -codes]])
+    return codes
+
+
+def code_length_for(n_stations):
+    return 1 << max(0, (n_stations - 1).bit_length())
+
+
+def bits_to_symbols(bits):
+    return 2 * np.asarray(bits, dtype=np.int8) - 1
+
+
+def symbols_to_bits(symbols):
+    return (np.asarray(symbols) > 0).astype(np.uint8)
+
+
+def encode(symbols, codes):
+    # symbols: (stations, symbol periods) -> chips: (symbol periods, code length)
+    symbols = np.asarray(symbols, dtype=np.float32)
+    return symbols.T @ codes[:symbols.shape[0]].astype(np.float32)
+
+
+def decode(chips, codes, n_stations=None):
+    # chips: (symbol periods, code length) -> symbols: (stations, symbol periods)
+    n_stations = n_stations or codes.shape[0]
+    return (codes[:n_stations].astype(np.float32) @ np.asarray(chips, dtype=np.float32).T) / codes.shape[1]
+
+
+FWHT_RADIX = 64
+
+
+def fwht(a):
+    # In-place fast Walsh-Hadamard transform along the last axis, in the
+    # same (natural) order as walsh_codes, vectorized over every leading
+    # axis. H_L = H_(L/r) (x) H_r, so the lowest log2(r) butterfly stages are
+    # done as one dense r x r product on contiguous blocks (where the
+    # butterflies would be too narrow to vectorize well) and the remaining
+    # stages as in-place butterfly passes. The passes need reshape() to
+    # return views, so a non-C-contiguous input is transformed in a
+    # contiguous copy that is then written back.
+    work = a if a.flags.c_contiguous else np.ascontiguousarray(a)
+    n = work.shape[-1]
+    r = min(n, FWHT_RADIX)
+    work[...] = (work.reshape(-1, r) @ walsh_codes(r).astype(work.dtype)).reshape(work.shape)
+    h = r
+    while h < n:
+        v = work.reshape(work.shape[:-1] + (n // (2 * h), 2, h))
+        x = v[..., 0, :]
+        y = v[..., 1, :]
+        x += y
+        y *= -2
+        y += x
+        h *= 2
+    if work is not a:
+        a[...] = work
+    return a
+
+
+def decode_fwht(chips, n_stations=None):
+    # Same result as decode(), in O(L log L) per symbol period.
+    chips = np.array(chips, dtype=np.float32)
+    length = chips.shape[-1]
+    if length & (length - 1):
+        raise ValueError("code length must be a power of two, got %d" % length)
+    fwht(chips)
+    chips /= length
+    return chips[:, :n_stations or length].T
+
+
+def awgn(chips, snr_db, rng=None):
+    # Per-chip SNR: each station transmits unit-power chips, and the noise
+    # variance is 10^(-snr_db/10).
+    rng = rng or np.random.default_rng()
+    sigma = np.float32(10 ** (-snr_db / 20))
+    return chips + sigma * rng.standard_normal(chips.shape, dtype=np.float32)
+
+
+def ber(n_stations, n_symbols, snr_db=None, code_length=None, block=65536, seed=None):
+    # Simulates n_symbols symbol periods for all stations in blocks and
+    # returns the bit error rate over every transmitted bit.
+    rng = np.random.default_rng(seed)
+    codes = walsh_codes(code_length or code_length_for(n_stations))
+    errors = 0
+
+    for start in range(0, n_symbols, block):
+        count = min(block, n_symbols - start)
+        bits = rng.integers(0, 2, size=(n_stations, count), dtype=np.uint8)
+        chips = encode(bits_to_symbols(bits), codes)
+        if snr_db is not None:
+            chips = awgn(chips, snr_db, rng)
+        errors += np.count_nonzero(symbols_to_bits(decode_fwht(chips, n_stations)) != bits)
+
+    return errors / (n_stations * n_symbols)
+
+
+def benchmark(n_symbols=4096, lengths=(64, 256, 1024, 4096)):
+    rng = np.random.default_rng(1)
+    for length in lengths:
+        codes = walsh_codes(length)
+        chips = encode(rng.choice(np.array([-1, 1], dtype=np.int8), size=(length, n_symbols)), codes)
+
+        start = time.perf_counter()
+        expected = decode(chips, codes)
+        matrix_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        got = decode_fwht(chips)
+        fwht_time = time.perf_counter() - start
+
+        assert np.allclose(expected, got)
+        print("L=%-5d %d symbols: matrix %.4f s, fwht %.4f s" % (length, n_symbols, matrix_time, fwht_time))
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--benchmark"]:
+    benchmark()
+elif __name__ == "__main__":
+    n_stations = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    n_symbols = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    for snr_db in (None, 0.0, -10.0, -20.0):
+        start = time.perf_counter()
+        rate = ber(n_stations, n_symbols, snr_db, seed=1)
+        label = "noiseless" if snr_db is None else "%.0f dB" % snr_db
+        print("%d stations, %d symbols, %-9s BER %.3e  (%.2f s)" % (n_stations, n_symbols, label, rate, time.perf_counter() - start))